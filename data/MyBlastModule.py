@@ -0,0 +1,370 @@
+#!/usr/bin/env Python
+
+""" Personal module for summarizing BLAST tabular (-outfmt 6 or 7) output. """
+import math
+import heapq
+import operator
+import itertools
+import collections
+from array import array
+
+## The columns of the default -outfmt 6/7 table
+BLAST_COLUMNS = ["qseqid", "sseqid", "pident", "length", "mismatch", "gapopen",
+                 "qstart", "qend", "sstart", "send", "evalue", "bitscore"]
+NUMERIC_COLUMNS = BLAST_COLUMNS[2:]
+
+## Columns holding text rather than numbers
+TEXT_COLUMNS = {"qseqid", "sseqid", "qacc", "sacc", "qaccver", "saccver", "qgi", "sgi",
+                "sallseqid", "sallacc", "stitle", "salltitles", "sstrand", "staxids"}
+
+## -outfmt 7 "# Fields:" descriptions of the common columns, by name
+FIELD_DESCRIPTIONS = {"query id": "qseqid", "subject id": "sseqid", "% identity": "pident",
+                      "alignment length": "length", "mismatches": "mismatch", "gap opens": "gapopen",
+                      "q. start": "qstart", "q. end": "qend", "s. start": "sstart", "s. end": "send",
+                      "evalue": "evalue", "bit score": "bitscore", "query length": "qlen",
+                      "subject length": "slen", "query acc.": "qacc", "subject acc.": "sacc",
+                      "query acc.ver": "qaccver", "subject acc.ver": "saccver", "score": "score",
+                      "% positives": "ppos", "subject title": "stitle", "% query coverage per subject": "qcovs"}
+
+BLAST_CHUNK_ROWS = 1 << 16
+BLAST_BUFFER_SIZE = 1 << 20
+
+def parse_fields_line(line: str) -> list[str]:
+    '''Given an -outfmt 7 "# Fields: ..." comment line, returns the column
+    names; unknown descriptions become their words joined by underscores'''
+    descriptions = line.split(":", 1)[1].strip().split(", ")
+    return [FIELD_DESCRIPTIONS.get(description, description.replace(" ", "_")) for description in descriptions]
+
+def table_fields(filename: str, fields: list[str] = None) -> list[str]:
+    '''Returns the column names blast_chunks() would give the first rows of
+    a BLAST tabular file: those of the last "# Fields:" line before the 
+    first row, else fields (default: BLAST_COLUMNS). Only the header is read.'''
+    if fields is None:
+        fields = BLAST_COLUMNS
+    with open(filename, "r") as blast_handle:
+        for line in blast_handle:
+            if line.startswith("# Fields:"):
+                fields = parse_fields_line(line)
+            elif line[0] not in "#\r\n":
+                break
+    return fields
+
+def rows_to_chunk(rows: list[list[str]], fields: list[str], keep: set[str] = None) -> dict:
+    '''Transposes split rows into a dictionary mapping each field (or only
+    those in keep) to a tuple of strings (TEXT_COLUMNS) or an array of 
+    doubles (all other columns)'''
+    chunk = dict()
+    ## zip(*rows) transposes the rows into columns in C
+    columns = list(zip(*rows))
+    assert len(columns) >= len(fields), f"Error: rows with fewer than {len(fields)} columns"
+    for name, column in zip(fields, columns):
+        if keep is not None and name not in keep:
+            continue
+        if name in TEXT_COLUMNS:
+            chunk[name] = column
+        else:
+            chunk[name] = array("d", map(float, column))
+    return chunk
+
+def blast_chunks(filename: str, chunk_rows: int = BLAST_CHUNK_ROWS, fields: list[str] = None,
+                 keep: set[str] = None):
+    '''Generator yielding the rows of a BLAST tabular file column-wise, in
+    chunks of up to chunk_rows lines: dictionaries as made by rows_to_chunk()
+    (with only the columns in keep, if given, converted). The columns are 
+    named by fields (default: BLAST_COLUMNS), or, in -outfmt 7 files, by the
+    latest "# Fields:" line. Other comment lines (starting with #) and blank
+    lines are skipped; extra columns are ignored.'''
+    if fields is None:
+        fields = BLAST_COLUMNS
+    with open(filename, "r", buffering = BLAST_BUFFER_SIZE) as blast_handle:
+        while True:
+            lines = list(itertools.islice(blast_handle, chunk_rows))
+            if len(lines) == 0:
+                break
+            num_columns = len(fields)
+            if "# Fields:" not in "".join(lines):
+                rows = [line.split("\t", num_columns) for line in lines if line[0] not in "#\r\n"]
+                if len(rows) > 0:
+                    yield rows_to_chunk(rows, fields, keep)
+                continue
+
+            ## a chunk with "# Fields:" lines is split wherever the fields change
+            rows = list()
+            for line in lines:
+                if line[0] not in "#\r\n":
+                    rows.append(line.split("\t", len(fields)))
+                elif line.startswith("# Fields:"):
+                    new_fields = parse_fields_line(line)
+                    if new_fields != fields:
+                        if len(rows) > 0:
+                            yield rows_to_chunk(rows, fields, keep)
+                            rows = list()
+                        fields = new_fields
+            if len(rows) > 0:
+                yield rows_to_chunk(rows, fields, keep)
+
+class QuantileSketch:
+    """ Approximate quantiles in bounded memory: values are counted in
+    log-spaced buckets (as in DDSketch), so any quantile is returned within
+    relative_accuracy of a true value, whatever the range of the data. Two
+    sketches with the same accuracy can be merged. """
+    def __init__(self, relative_accuracy: float = 0.01) -> None:
+        """ Constructor """
+        assert 0.0 < relative_accuracy < 1.0, "Error: relative accuracy must be between 0 and 1"
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1.0 + relative_accuracy) / (1.0 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.positive_buckets = collections.Counter()    # bucket index -> count
+        self.negative_buckets = collections.Counter()    # for -value
+        self.zero_count = 0
+        self.count = 0
+
+    def _bucket_indexes(self, values):
+        '''Bucket index ceil(log_gamma(value)) of each positive value, computed
+        by map() chains so the loop runs in C'''
+        logs = map(math.log, values)
+        return map(math.ceil, map(operator.truediv, logs, itertools.repeat(self.log_gamma)))
+
+    def update(self, values) -> None:
+        '''Adds an array (or other sequence) of values to the sketch'''
+        values = array("d", values)
+        self.positive_buckets.update(self._bucket_indexes(filter((0.0).__lt__, values)))
+        self.negative_buckets.update(self._bucket_indexes(map(operator.neg, filter((0.0).__gt__, values))))
+        self.zero_count = self.zero_count + values.count(0.0)
+        self.count = self.count + len(values)
+
+    def merge(self, other) -> None:
+        '''Adds the counts of another sketch with the same accuracy'''
+        assert other.gamma == self.gamma, "Error: cannot merge sketches of different accuracy"
+        self.positive_buckets.update(other.positive_buckets)
+        self.negative_buckets.update(other.negative_buckets)
+        self.zero_count = self.zero_count + other.zero_count
+        self.count = self.count + other.count
+
+    def quantile(self, q: float) -> float:
+        '''Returns an estimate of the q quantile (0 <= q <= 1), or nan if empty'''
+        assert 0.0 <= q <= 1.0, "Error: quantile must be between 0 and 1"
+        if self.count == 0:
+            return float("nan")
+        rank = q * (self.count - 1)
+        seen = 0
+        for index in sorted(self.negative_buckets, reverse = True):
+            seen = seen + self.negative_buckets[index]
+            if seen > rank:
+                return -self._bucket_value(index)
+        seen = seen + self.zero_count
+        if seen > rank:
+            return 0.0
+        for index in sorted(self.positive_buckets):
+            seen = seen + self.positive_buckets[index]
+            if seen > rank:
+                return self._bucket_value(index)
+        return self._bucket_value(max(self.positive_buckets))
+
+    def _bucket_value(self, index: int) -> float:
+        '''The value within relative_accuracy of everything in bucket index'''
+        return 2.0 * self.gamma ** index / (self.gamma + 1.0)
+
+class ColumnStats:
+    """ Running count, sum, min and max of a numeric column (and, optionally,
+    a QuantileSketch); updated an array at a time and mergeable """
+    def __init__(self, quantiles: bool = True, relative_accuracy: float = 0.01) -> None:
+        """ Constructor """
+        self.count = 0
+        self.total = 0.0
+        self.minimum = math.inf
+        self.maximum = -math.inf
+        self.sketch = None
+        if quantiles:
+            self.sketch = QuantileSketch(relative_accuracy)
+
+    def update(self, values) -> None:
+        '''Adds an array of values; sum, min and max each run in C'''
+        if len(values) == 0:
+            return
+        self.count = self.count + len(values)
+        self.total = self.total + math.fsum(values)
+        self.minimum = min(self.minimum, min(values))
+        self.maximum = max(self.maximum, max(values))
+        if self.sketch is not None:
+            self.sketch.update(values)
+
+    def merge(self, other) -> None:
+        '''Adds the values summarized by another ColumnStats'''
+        self.count = self.count + other.count
+        self.total = self.total + other.total
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+        if self.sketch is not None and other.sketch is not None:
+            self.sketch.merge(other.sketch)
+
+    def mean(self) -> float:
+        '''Returns the mean, or nan if no values were added'''
+        if self.count == 0:
+            return float("nan")
+        return self.total / self.count
+
+    def quantile(self, q: float) -> float:
+        '''Returns the approximate q quantile (see QuantileSketch)'''
+        assert self.sketch is not None, "Error: quantiles were not tracked"
+        return self.sketch.quantile(q)
+
+def query_runs(qseqids) -> list[tuple[str,int,int]]:
+    '''Given a column of query ids, returns (qseqid, start, end) for each run
+    of consecutive equal ids (BLAST writes all hits of a query together)'''
+    runs = list()
+    start = 0
+    for qseqid, group in itertools.groupby(qseqids):
+        end = start + sum(1 for _ in group)
+        runs.append((qseqid, start, end))
+        start = end
+    return runs
+
+def blast_stats(filename: str, columns: list[str], per_query: bool = False,
+                relative_accuracy: float = 0.01, fields: list[str] = None) -> tuple[dict,dict]:
+    '''Summarizes the given numeric columns of a BLAST tabular file (with 
+    columns named as in blast_chunks()) in one streaming pass. Returns
+    (column -> ColumnStats, qseqid -> column -> ColumnStats), all with
+    quantile sketches; the second dictionary is only filled in with 
+    per_query=True, and lists queries in file order. A query's sketch only
+    holds as many buckets as its values span, so per-query memory stays small.'''
+    columns_to_stats = {column: ColumnStats(True, relative_accuracy) for column in columns}
+    queries_to_stats = dict()
+    keep = set(columns)
+    if per_query:
+        keep.add("qseqid")
+    for chunk in blast_chunks(filename, fields = fields, keep = keep):
+        for column in columns:
+            assert column in chunk, f"Error: no {column} column in {filename}"
+            assert column not in TEXT_COLUMNS, f"Error: not a numeric BLAST column: {column}"
+            columns_to_stats[column].update(chunk[column])
+        if per_query:
+            for qseqid, start, end in query_runs(chunk["qseqid"]):
+                if qseqid not in queries_to_stats:
+                    queries_to_stats[qseqid] = {column: ColumnStats(True, relative_accuracy) for column in columns}
+                query_stats = queries_to_stats[qseqid]
+                for column in columns:
+                    query_stats[column].update(chunk[column][start:end])
+    return (columns_to_stats, queries_to_stats)
+
+## Whether a higher value is a better hit, for the columns hits can be ranked by
+RANK_HIGHER_IS_BETTER = {"evalue": False, "bitscore": True, "score": True, "pident": True, "length": True}
+
+def best_hits(filename: str, n: int = 1, rank_by: str = "evalue", by_subject: bool = False,
+              fields: list[str] = None):
+    '''Generator yielding (id, lines) for each query of a BLAST tabular file,
+    where lines are the (up to) n best of its hit lines, best first, ranked
+    by the rank_by column (ties go to the earlier line). Columns are named 
+    as in blast_chunks(). Each query keeps a heap of at most n lines; as 
+    BLAST writes a query's hits together, a query is yielded (and its heap
+    dropped) when the next one starts. With by_subject=True, hits are grouped
+    by subject instead, for reciprocal best hits; subjects are not grouped
+    in the file, so all their heaps are kept and yielded, in first-seen 
+    order, at the end.'''
+    assert n > 0, "Error: n must be at least 1"
+    assert rank_by in RANK_HIGHER_IS_BETTER, f"Error: cannot rank hits by {rank_by}"
+    if fields is None:
+        fields = BLAST_COLUMNS
+    higher_is_better = RANK_HIGHER_IS_BETTER[rank_by]
+    group_column = "sseqid" if by_subject else "qseqid"
+
+    ids_to_heaps = dict()
+    current_id = None
+    order = 0
+    indexed_fields = None       # the fields that group_index and rank_index refer to
+    with open(filename, "r", buffering = BLAST_BUFFER_SIZE) as blast_handle:
+        for line in blast_handle:
+            if line[0] in "#\r\n":
+                if line.startswith("# Fields:"):
+                    fields = parse_fields_line(line)
+                continue
+            if fields is not indexed_fields:
+                indexed_fields = fields
+                for column in [group_column, rank_by]:
+                    assert column in fields, f"Error: no {column} column in {filename}"
+                group_index = fields.index(group_column)
+                rank_index = fields.index(rank_by)
+                num_split = max(group_index, rank_index) + 1
+            line_list = line.split("\t", num_split)
+            group_id = line_list[group_index]
+            rank = float(line_list[rank_index])
+
+            if not by_subject and group_id != current_id:
+                if current_id is not None:
+                    yield (current_id, sorted_heap_lines(ids_to_heaps.pop(current_id)))
+                current_id = group_id
+            if group_id not in ids_to_heaps:
+                ids_to_heaps[group_id] = list()
+            heap = ids_to_heaps[group_id]
+
+            ## the heap's first entry is the worst kept hit: the lowest 
+            ## priority, and among equal priorities the latest line
+            if not higher_is_better:
+                rank = -rank
+            order = order + 1
+            entry = (rank, -order, line.rstrip("\r\n"))
+            if len(heap) < n:
+                heapq.heappush(heap, entry)
+            else:
+                heapq.heappushpop(heap, entry)
+
+    for group_id, heap in ids_to_heaps.items():
+        yield (group_id, sorted_heap_lines(heap))
+
+def sorted_heap_lines(heap: list[tuple]) -> list[str]:
+    '''Returns the lines of a best_hits() heap, best first'''
+    return [entry[2] for entry in sorted(heap, reverse = True)]
+
+if __name__ == "__main__":      #only run tests when script is executed, not imported
+    import os
+    import random
+    import tempfile
+    print(f"{__file__.split('/')[-1]} was executed.\n\tRunning tests...\n")
+
+    ## Sketch quantiles stay within 1% of the exact ones, also after a merge
+    random.seed(1)
+    values = [10 ** random.uniform(-50, 3) for i in range(0, 5000)] + [0.0] * 500
+    sketch1 = QuantileSketch()
+    sketch1.update(values[0:2000])
+    sketch2 = QuantileSketch()
+    sketch2.update(values[2000:])
+    sketch1.merge(sketch2)
+    values.sort()
+    for q in [0.0, 0.05, 0.5, 0.9, 1.0]:
+        exact = values[int(q * (len(values) - 1))]
+        assert abs(sketch1.quantile(q) - exact) <= 0.01 * exact, "Failed Test"
+    negative_sketch = QuantileSketch()
+    negative_sketch.update([-4.0, -2.0, 1.0])
+    assert abs(negative_sketch.quantile(0.0) + 4.0) <= 0.04, "Failed Test"
+    print("Passed quantile sketch tests!")
+
+    ## A -outfmt 7 style table with comments and two queries
+    fd, test_filename = tempfile.mkstemp(suffix = ".txt")
+    with os.fdopen(fd, "w") as fhandle:
+        fhandle.write("# BLASTX 2.2.30+\n# Query: q1\n# Fields: query id, subject id, % identity, alignment length, ")
+        fhandle.write("mismatches, gap opens, q. start, q. end, s. start, s. end, evalue, bit score\n")
+        fhandle.write("q1\ts1\t30.0\t100\t5\t1\t1\t300\t1\t100\t1e-30\t  120\n")
+        fhandle.write("q1\ts2\t50.0\t80\t5\t1\t1\t240\t1\t80\t1e-10\t60.5\n")
+        fhandle.write("# Query: q2\n# 0 hits found\n# Query: q3\n")
+        fhandle.write("q3\ts1\t40.0\t90\t5\t1\t1\t270\t1\t90\t0.0\t200\n")
+    chunks = list(blast_chunks(test_filename, chunk_rows = 4))
+    assert [chunk["qseqid"] for chunk in chunks] == [("q1",), ("q1",), ("q3",)], "Failed Test"
+    columns_to_stats, queries_to_stats = blast_stats(test_filename, ["evalue", "bitscore"], per_query = True)
+    assert columns_to_stats["bitscore"].count == 3 and columns_to_stats["bitscore"].maximum == 200.0, "Failed Test"
+    assert columns_to_stats["evalue"].minimum == 0.0, "Failed Test"
+    assert list(queries_to_stats) == ["q1", "q3"], "Failed Test"
+    assert queries_to_stats["q1"]["bitscore"].mean() == 90.25, "Failed Test"
+    assert abs(queries_to_stats["q1"]["bitscore"].quantile(1.0) - 120.0) <= 1.2, "Failed Test"
+    assert table_fields(test_filename)[0:3] == ["qseqid", "sseqid", "pident"], "Failed Test"
+    assert parse_fields_line("# Fields: query id, query length, evalue\n") == ["qseqid", "qlen", "evalue"], "Failed Test"
+    assert query_runs(("a", "a", "b")) == [("a", 0, 2), ("b", 2, 3)], "Failed Test"
+
+    ## q1's two hits ranked both ways; by subject, s1 collects hits from q1 and q3
+    hits = list(best_hits(test_filename, 1))
+    assert [(id, [line.split("\t")[1] for line in lines]) for id, lines in hits] == [("q1", ["s1"]), ("q3", ["s1"])], "Failed Test"
+    hits = dict(best_hits(test_filename, 2, rank_by = "pident"))
+    assert [line.split("\t")[1] for line in hits["q1"]] == ["s2", "s1"], "Failed Test"
+    hits = dict(best_hits(test_filename, 1, rank_by = "bitscore", by_subject = True))
+    assert list(hits) == ["s1", "s2"] and hits["s1"][0].startswith("q3\t"), "Failed Test"
+    os.remove(test_filename)
+    print("Passed BLAST table tests!")
@@ -0,0 +1,127 @@
+#!/usr/bin/env Python
+
+""" Personal module for scanning codons in all reading frames and finding ORFs. """
+import MySeqModule
+
+STOP_CODONS = ["TAA", "TAG", "TGA"]
+START_CODONS = ["ATG"]
+
+## Marks in a codon_marks() table
+NO_MARK = 0
+STOP_MARK = 1
+START_MARK = 2
+
+def codon_code(codon: str) -> int:
+    '''Returns the codon_codes() value of a 3-base codon'''
+    a, b, c = MySeqModule.encode_2bit(codon)
+    return 25 * a + 5 * b + c
+
+def codon_marks(codons_to_marks: dict[str,int]) -> bytes:
+    '''Returns a bytes.translate() table mapping codon_codes() values to the
+    given marks (NO_MARK for every codon not listed)'''
+    table = bytearray(256)
+    for codon, mark in codons_to_marks.items():
+        table[codon_code(codon)] = mark
+    return bytes(table)
+
+_STOP_TABLE = codon_marks({codon: STOP_MARK for codon in STOP_CODONS})
+_START_TABLE = codon_marks({codon: START_MARK for codon in START_CODONS})
+_ORF_TABLE = codon_marks({**{codon: STOP_MARK for codon in STOP_CODONS},
+                          **{codon: START_MARK for codon in START_CODONS}})
+
+def codon_codes(seq: str) -> bytes:
+    '''Given a DNA sequence, returns one byte per position i (len(seq) - 2 of
+    them) coding the codon seq[i:i+3] as 25*a + 5*b + c from the base codes
+    of MySeqModule.encode_2bit() (0-3 for A/C/G/T, 4 for anything else, so
+    every codon, with or without ambiguous bases, has its own value). The
+    sequence is encoded once and all codons are formed by adding shifted 
+    multiples of it as one big integer; no byte can carry, since each sum 
+    is at most 25*4 + 5*4 + 4 = 124.'''
+    codes = MySeqModule.encode_2bit(seq)
+    n = len(codes)
+    if n < 3:
+        return b""
+    as_int = int.from_bytes(codes, "big")
+    ## byte j of the sum holds 25*codes[j-2] + 5*codes[j-1] + codes[j]
+    summed = as_int * 25 + (as_int << 8) * 5 + (as_int << 16)
+    return summed.to_bytes(n + 2, "big")[2:n]
+
+def frame_counts(codons: bytes, table: bytes = _STOP_TABLE, mark: int = STOP_MARK) -> list[int]:
+    '''Given codon_codes() output, returns the number of codons marked by
+    table in each of the three frames (frame f = codons starting at f, f+3, ...)'''
+    marks = codons.translate(table)
+    return [marks[frame::3].count(mark) for frame in range(0, 3)]
+
+def codon_frame_counts(seq: str, reverse: bool = False) -> dict[str,list[int]]:
+    '''Returns {"stops": [frame 0, 1, 2 counts], "starts": [...]} for seq or,
+    with reverse=True, for its reverse complement'''
+    if reverse:
+        seq = MySeqModule.reverse_complement(str(seq))
+    codons = codon_codes(seq)
+    return {"stops": frame_counts(codons, _STOP_TABLE, STOP_MARK),
+            "starts": frame_counts(codons, _START_TABLE, START_MARK)}
+
+def frame_orfs(marks: bytes, frame: int, min_length: int) -> list[tuple[int,int]]:
+    '''Given the _ORF_TABLE marks of one frame's codons, returns (start, end)
+    of each ORF from an ATG to the first in-frame stop (included), at least
+    min_length bases long, in sequence coordinates (0-based, end-exclusive).
+    Each ORF starts at the first ATG after the previous ORF's stop.'''
+    orfs = list()
+    search_from = 0
+    while True:
+        start_index = marks.find(START_MARK, search_from)
+        if start_index == -1:
+            break
+        stop_index = marks.find(STOP_MARK, start_index)
+        if stop_index == -1:
+            break
+        start = frame + 3 * start_index
+        end = frame + 3 * stop_index + 3
+        if end - start >= min_length:
+            orfs.append((start, end))
+        search_from = stop_index + 1
+    return orfs
+
+def find_orfs(seq: str, min_length: int = 300, both_strands: bool = True) -> list[tuple[str,int,int,int]]:
+    '''Returns (strand, frame, start, end) for every ORF (ATG to stop, see
+    frame_orfs()) of at least min_length bases in seq and, by default, its
+    reverse complement. start and end are 0-based, end-exclusive coordinates
+    on the forward strand; frame is counted from the 5' end of the ORF's own
+    strand. ORFs with no stop before the end of the sequence are left out.'''
+    orfs = list()
+    marks = codon_codes(seq).translate(_ORF_TABLE)
+    for frame in range(0, 3):
+        for start, end in frame_orfs(marks[frame::3], frame, min_length):
+            orfs.append(("+", frame, start, end))
+    if both_strands:
+        seq_len = len(seq)
+        marks = codon_codes(MySeqModule.reverse_complement(str(seq))).translate(_ORF_TABLE)
+        for frame in range(0, 3):
+            for start, end in frame_orfs(marks[frame::3], frame, min_length):
+                orfs.append(("-", frame, seq_len - end, seq_len - start))
+    return orfs
+
+if __name__ == "__main__":      #only run tests when script is executed, not imported
+    import random
+    print(f"{__file__.split('/')[-1]} was executed.\n\tRunning tests...\n")
+
+    assert codon_code("TAA") == 75 and codon_code("ATG") == 17, "Failed Test"
+    assert list(codon_codes("ATGN")) == [17, 25 * 3 + 5 * 2 + 4], "Failed Test"
+    assert codon_frame_counts("GNA")["stops"] == [0, 0, 0], "Failed Test"
+
+    ## frame counts agree with slicing every codon out of a random sequence
+    random.seed(1)
+    seq = "".join(random.choice("ACGTacgtN") for i in range(0, 5000))
+    upper_seq = seq.upper()
+    expected = [0, 0, 0]
+    for index in range(0, len(seq) - 3 + 1):
+        if upper_seq[index:index + 3] in STOP_CODONS:
+            expected[index % 3] = expected[index % 3] + 1
+    assert codon_frame_counts(seq)["stops"] == expected, "Failed Test"
+    print("Passed codon scanning tests!")
+
+    ## ATG AAA TAG on the forward strand; CTA CAT is ATG TAG reversed
+    assert find_orfs("CATGAAATAGC", 9) == [("+", 1, 1, 10)], "Failed Test"
+    assert find_orfs("CTACATGG", 6) == [("-", 2, 0, 6)], "Failed Test"
+    assert find_orfs("ATGAAA", 3) == [], "Failed Test"      ## no stop
+    print("Passed ORF tests!")
@@ -0,0 +1,184 @@
+#!/usr/bin/env Python
+
+""" Personal module for parsing FASTA files. """
+import os
+import mmap
+import MySeqModule
+
+def fasta_records(filename: str):
+    '''Generator that yields (id, seq) tuples from a FASTA file, one record
+    at a time. Only the current record is held in memory, so peak memory
+    tracks the largest single record rather than the size of the file.
+    The id is the first whitespace-delimited word of the header line.'''
+    current_id = None
+    current_seq_list = list()
+    with open(filename, "r") as fhandle:
+        for line in fhandle:
+            if line[0:1] == ">":
+                if current_id is not None:
+                    yield (current_id, "".join(current_seq_list))
+                header_list = line.split(None, 1)
+                current_id = header_list[0][1:]
+                current_seq_list = list()
+            else:
+                current_seq_list.append(line.strip())
+
+    if current_id is not None:
+        yield (current_id, "".join(current_seq_list))
+
+def fasta_hash_from_file(filename: str, packed: bool = False) -> dict:
+    '''Given a FASTA file name, returns a dictionary of ids to sequences.
+    Holds the whole file in memory; prefer fasta_records() for large files.
+    With packed=True the values are MySeqModule.PackedSeq objects, which use
+    about a quarter of the memory of str values (and are stored uppercase).'''
+    seqs_dict = dict()
+    for id, seq in fasta_records(filename):
+        if packed:
+            seq = MySeqModule.PackedSeq(seq)
+        seqs_dict[id] = seq
+    return seqs_dict
+
+def build_fai(filename: str) -> str:
+    '''Given a FASTA file name, writes a samtools-compatible index next to it
+    (filename + ".fai") with one line per record: name, length, offset of the
+    first base, bases per line, and bytes per line (including the newline).
+    Every line of a record except the last must have the same length.
+    Returns the index file name.'''
+    fai_filename = filename + ".fai"
+    entries = list()
+    names_seen = set()
+    entry = None
+
+    with open(filename, "rb") as fhandle:
+        offset = 0
+        for line in fhandle:
+            line_width = len(line)
+            if line[0:1] == b">":
+                name = line.split(None, 1)[0][1:].decode()
+                assert name not in names_seen, f"Duplicate FASTA record: {name}"
+                names_seen.add(name)
+                ## [name, length, offset, line bases, line width, last line was short]
+                entry = [name, 0, offset + line_width, 0, 0, False]
+                entries.append(entry)
+            else:
+                line_bases = len(line.rstrip(b"\r\n"))
+                if line_bases > 0:
+                    assert entry is not None, "Sequence data before the first FASTA header"
+                    assert not entry[5], f"Inconsistent line length in FASTA record: {entry[0]}"
+                    if entry[3] == 0:
+                        entry[3] = line_bases
+                        entry[4] = line_width
+                    elif line_bases != entry[3] or line_width != entry[4]:
+                        ## only the last line may be shorter (or lack its newline)
+                        assert line_bases <= entry[3], f"Inconsistent line length in FASTA record: {entry[0]}"
+                        entry[5] = True
+                    entry[1] = entry[1] + line_bases
+                elif entry is not None and entry[1] > 0:
+                    ## a blank line may only end a record
+                    entry[5] = True
+            offset = offset + line_width
+
+    with open(fai_filename, "w") as fai_handle:
+        for name, length, offset, line_bases, line_width, short_line in entries:
+            fai_handle.write(f"{name}\t{length}\t{offset}\t{line_bases}\t{line_width}\n")
+    return fai_filename
+
+def read_fai(fai_filename: str) -> dict[str,list[int]]:
+    '''Given a .fai file name, returns a dictionary mapping each record name
+    to [length, offset, line bases, line width].'''
+    names_to_entries = dict()
+    with open(fai_filename, "r") as fai_handle:
+        for line in fai_handle:
+            line_list = line.rstrip("\n").split("\t")
+            names_to_entries[line_list[0]] = [int(field) for field in line_list[1:5]]
+    return names_to_entries
+
+class IndexedFasta:
+    """ Random access to FASTA records through a .fai index and a memory map """
+    def __init__(self, filename: str) -> None:
+        '''Constructor; builds filename + ".fai" if it is missing or older than
+        the FASTA file, then memory-maps the FASTA file for reading.'''
+        self.filename = filename
+        fai_filename = filename + ".fai"
+        if not os.path.exists(fai_filename) or os.path.getmtime(fai_filename) < os.path.getmtime(filename):
+            build_fai(filename)
+        self.names_to_entries = read_fai(fai_filename)
+
+        self.fhandle = open(filename, "rb")
+        if os.path.getsize(filename) > 0:
+            self.mm = mmap.mmap(self.fhandle.fileno(), 0, access = mmap.ACCESS_READ)
+        else:
+            self.mm = b""
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.names_to_entries
+
+    def __len__(self) -> int:
+        return len(self.names_to_entries)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def names(self) -> list[str]:
+        '''Returns the record names, in file order'''
+        return list(self.names_to_entries)
+
+    def get_length(self, name: str) -> int:
+        '''Returns the sequence length of the named record'''
+        return self.names_to_entries[name][0]
+
+    def fetch(self, name: str, start: int = 0, end: int = None) -> str:
+        '''Returns the sequence of the named record from start to end, using
+        0-based, end-exclusive coordinates like a string slice (end=None means
+        the end of the record). Only the bytes holding that region are read.'''
+        assert name in self.names_to_entries, f"No such FASTA record: {name}"
+        length, offset, line_bases, line_width = self.names_to_entries[name]
+        if end is None or end > length:
+            end = length
+        start = max(start, 0)
+        if start >= end:
+            return ""
+
+        start_byte = offset + (start // line_bases) * line_width + start % line_bases
+        end_byte = offset + ((end - 1) // line_bases) * line_width + (end - 1) % line_bases + 1
+        region = self.mm[start_byte:end_byte]
+        return region.replace(b"\n", b"").replace(b"\r", b"").decode()
+
+    def close(self) -> None:
+        '''Releases the memory map and file handle'''
+        if isinstance(self.mm, mmap.mmap):
+            self.mm.close()
+        self.fhandle.close()
+
+if __name__ == "__main__":      #only run tests when script is executed, not imported
+    import tempfile
+    print(f"{__file__.split('/')[-1]} was executed.\n\tRunning tests...\n")
+
+    ## A small test file: a wrapped record, a description, and an empty record
+    test_fasta = ">seqA some description\nACGT\nAC\n>seqB\nGGGG\n>seqC\n"
+    fd, test_filename = tempfile.mkstemp(suffix = ".fasta")
+    with os.fdopen(fd, "w") as fhandle:
+        fhandle.write(test_fasta)
+
+    records = list(fasta_records(test_filename))
+    assert records == [("seqA", "ACGTAC"), ("seqB", "GGGG"), ("seqC", "")], "Failed Test"
+    assert fasta_hash_from_file(test_filename)["seqA"] == "ACGTAC", "Failed Test"
+    assert fasta_hash_from_file(test_filename, packed = True)["seqA"] == "ACGTAC", "Failed Test"
+    print("Passed FASTA parsing tests!")
+
+    ## seqA starts at byte 23 with 4 bases (5 bytes) per line
+    build_fai(test_filename)
+    with open(test_filename + ".fai", "r") as fai_handle:
+        assert fai_handle.readline() == "seqA\t6\t23\t4\t5\n", "Failed Test"
+    with IndexedFasta(test_filename) as indexed:
+        assert indexed.fetch("seqA") == "ACGTAC", "Failed Test"
+        assert indexed.fetch("seqA", 2, 5) == "GTA", "Failed Test"     ## spans a line break
+        assert indexed.fetch("seqB", 1) == "GGG", "Failed Test"
+        assert indexed.fetch("seqC") == "", "Failed Test"
+        assert indexed.names() == ["seqA", "seqB", "seqC"], "Failed Test"
+    os.remove(test_filename + ".fai")
+    os.remove(test_filename)
+    print("Passed FASTA index tests!")
@@ -0,0 +1,639 @@
+#!/usr/bin/env Python
+
+""" Personal module of sequence-analysis kernels (k-mers, repeats, etc.). """
+import re
+import bisect
+import itertools
+import collections
+from array import array
+
+## Translation table mapping ASCII bases to 2-bit codes: A=0, C=1, G=2, T=3
+## (either case); every other byte maps to 4, which breaks k-mer windows.
+_CODE_TABLE = bytearray([4]) * 256
+for _code, _base in enumerate(b"ACGT"):
+    _CODE_TABLE[_base] = _code
+    _CODE_TABLE[_base + 32] = _code
+_CODE_TABLE = bytes(_CODE_TABLE)
+
+_COMPLEMENT_TABLE = str.maketrans("ACGTNacgtn", "TGCANtgcan")
+
+## Translation table mapping byte 0 to 0 and every other byte to 1
+_NONZERO_TABLE = bytes([0]) + bytes([1]) * 255
+
+## For 2-bit packed bytes (4 bases per byte, first base in the high bits):
+## _UNPACK_TABLES[j] maps a packed byte to the code of its j-th base, and
+## _CODE_COUNT_TABLES[code] maps a packed byte to how many of its bases have code
+_UNPACK_TABLES = list()
+for _slot in range(0, 4):
+    _UNPACK_TABLES.append(bytes([(_byte >> (6 - 2 * _slot)) & 3 for _byte in range(0, 256)]))
+_CODE_COUNT_TABLES = list()
+for _code in range(0, 4):
+    _CODE_COUNT_TABLES.append(bytes([[table[_byte] for table in _UNPACK_TABLES].count(_code) for _byte in range(0, 256)]))
+
+_DECODE_TABLE = bytes.maketrans(b"\x00\x01\x02\x03", b"ACGT")
+
+## Runs of a single repeated non-ACGT character (N, ambiguity codes, etc.)
+_AMBIGUOUS_RUN_RE = re.compile(rb"([^ACGT])\1*")
+
+MAX_K = 12
+
+BASES = "ACGTN"
+
+def encode_2bit(seq: str) -> bytes:
+    '''Given a DNA sequence string, returns a bytes object with one 2-bit
+    code (0-3) per A/C/G/T base, and 4 for any other character.'''
+    if isinstance(seq, PackedSeq):
+        return seq.codes()
+    return seq.encode("ascii", "replace").translate(_CODE_TABLE)
+
+def reverse_complement(seq: str) -> str:
+    '''Given a DNA sequence string, returns its reverse complement'''
+    return seq.translate(_COMPLEMENT_TABLE)[::-1]
+
+def base_counts(seq: str, bases: str = BASES) -> dict[str,int]:
+    '''Given a sequence string, returns a dictionary of counts for each of
+    the (uppercase) bases, by default A, C, G, T and N, case-insensitive.
+    Counting uses str.count(), which runs in C, rather than a per-character
+    Python loop. A PackedSeq is counted directly in its packed form.'''
+    if isinstance(seq, PackedSeq):
+        return seq.base_counts(bases)
+    counts = dict()
+    for base in bases:
+        counts[base] = seq.count(base) + seq.count(base.lower())
+    return counts
+
+def batch_base_counts(seqs) -> list[dict[str,int]]:
+    '''Given an iterable of sequence strings, returns a list of base_counts()
+    dictionaries, one per sequence, in the same order.'''
+    return [base_counts(seq) for seq in seqs]
+
+def gc_content(seq: str) -> float:
+    '''Given a DNA sequence string, returns the (unrounded) fraction of its
+    characters that are G or C, case-insensitive.'''
+    counts = base_counts(seq)
+    return (counts["G"] + counts["C"])/len(seq)
+
+def kmer_to_str(code: int, k: int) -> str:
+    '''Given a packed k-mer code and k, returns the k-mer as a string.'''
+    letters = list()
+    for shift in range(2 * (k - 1), -1, -2):
+        letters.append("ACGT"[(code >> shift) & 3])
+    return "".join(letters)
+
+def revcomp_code(code: int, k: int) -> int:
+    '''Given a packed k-mer code and k, returns the code of its reverse complement.'''
+    rc = 0
+    for i in range(0, k):
+        rc = (rc << 2) | (3 - (code & 3))
+        code = code >> 2
+    return rc
+
+def rolling_kmer_codes(codes, k: int, canonical: bool = False):
+    '''Given encode_2bit() codes (bytes or a memoryview of them), yields
+    (code, run) after each base: code is the packed k-mer ending at that base
+    and run the number of consecutive A/C/G/T bases ending there, so code is
+    a full k-mer only when run >= k. With canonical=True, code is the smaller
+    of the k-mer and its reverse complement, kept with a second rolling code.'''
+    mask = (1 << (2 * k)) - 1
+    rc_shift = 2 * (k - 1)
+    code = 0
+    rc = 0
+    run = 0
+    if not canonical:
+        for base_code in codes:
+            if base_code < 4:
+                code = ((code << 2) | base_code) & mask
+                run = run + 1
+            else:
+                run = 0
+            yield (code, run)
+        return
+    for base_code in codes:
+        if base_code < 4:
+            code = ((code << 2) | base_code) & mask
+            rc = (rc >> 2) | ((3 - base_code) << rc_shift)
+            run = run + 1
+        else:
+            run = 0
+        yield (min(code, rc), run)
+
+## Largest k whose 4^k counts are kept in a list (512 KB at k = 8); larger
+## k use 4-byte array slots, half a list's size (64 MB rather than 128 MB at k = 12)
+LIST_COUNTS_MAX_K = 8
+
+def kmer_count_slots(k: int):
+    '''Returns 4^k zeroed k-mer count slots: a list for small k (its items
+    are the fastest to update), an array("I") for larger k.'''
+    if k <= LIST_COUNTS_MAX_K:
+        return [0] * (4 ** k)
+    return array("I", bytes(4 * 4 ** k))
+
+class KmerCounter:
+    """ Counts k-mers with a rolling 2-bit encoding into flat count slots;
+    only the slots a sequence touches are reset or scanned, so each call
+    costs O(len(seq)) whatever the number of slots """
+    def __init__(self, k: int, canonical: bool = False) -> None:
+        """ Constructor; canonical=True merges each k-mer with its reverse complement """
+        assert 1 <= k <= MAX_K, f"Error: k must be between 1 and {MAX_K}"
+        self.k = k
+        self.canonical = canonical
+        self.counts = kmer_count_slots(k)
+        ## codes with a nonzero count after the last count(), in first-seen order
+        self.touched = list()
+
+    def count(self, seq: str):
+        '''Counts every k-mer of seq made only of A/C/G/T (case-insensitive)
+        and returns the kmer_count_slots() counts, indexed by packed k-mer 
+        code (canonical codes only, with canonical=True). The same slots are
+        reused on every call; self.touched lists the nonzero codes in order
+        of first occurrence.'''
+        k = self.k
+        counts = self.counts
+        for code in self.touched:
+            counts[code] = 0
+        touched = list()
+        for code, run in rolling_kmer_codes(encode_2bit(seq), k, self.canonical):
+            if run >= k:
+                if counts[code] == 0:
+                    touched.append(code)
+                counts[code] += 1
+        self.touched = touched
+        return counts
+
+    def kmer_codes(self, seq: str):
+        '''Generator yielding the packed code of each A/C/G/T-only k-mer
+        window of seq, in sequence order.'''
+        k = self.k
+        for code, run in rolling_kmer_codes(encode_2bit(seq), k):
+            if run >= k:
+                yield code
+
+    def most_common(self, seq: str) -> list:
+        '''Returns [kmer, count] for the most common k-mer in seq, or ["", 0]
+        if seq has no full-length window. Ties go to the k-mer that occurs
+        first in seq, as most_common_fivemer in fasta_stats.py did.'''
+        counts = self.count(seq)
+        if not self.touched:
+            return ["", 0]
+        ## touched is in first-occurrence order, so max() keeps the first tie
+        best_code = max(self.touched, key = counts.__getitem__)
+        return [kmer_to_str(best_code, self.k), counts[best_code]]
+
+def most_common_kmer(seq: str, k: int = 5, canonical: bool = False) -> list:
+    '''Convenience wrapper returning [kmer, count] for the most common k-mer'''
+    return KmerCounter(k, canonical).most_common(seq)
+
+def longest_perfect_repeat(seq: str, min_period: int = 2, max_period: int = 10) -> list:
+    '''Given a sequence string, returns [length, repeat, unit] for the longest
+    perfect tandem repeat with a unit of min_period to max_period characters
+    (units made of a single repeated character are ignored). Only whole copies
+    of the unit count toward the length; ties go to the leftmost repeat. If no
+    repeat is found, returns [1, seq[0], seq[0]].
+
+    Each period p is checked in one pass: seq[i] == seq[i + p] is computed for
+    every i at once by XOR-ing the sequence with itself shifted by p bytes, and
+    runs of equal positions are then found with bytes.find(), so the scan
+    takes O((max_period - min_period + 1) * n) time with no backtracking.'''
+    assert 1 <= min_period <= max_period <= 10, "Error: periods must be between 1 and 10"
+    if isinstance(seq, PackedSeq):
+        seq = str(seq)
+    max_len = 1
+    max_rep = seq[0]
+    max_unit = seq[0]
+    best_start = len(seq)
+
+    seq_bytes = seq.encode("ascii", "replace")
+    seq_len = len(seq_bytes)
+    for period in range(min_period, max_period + 1):
+        if seq_len < 2 * period:
+            break
+        ## diff[i] is 0 where seq[i] == seq[i + period] and 1 elsewhere
+        diff_int = int.from_bytes(seq_bytes[:-period], "big") ^ int.from_bytes(seq_bytes[period:], "big")
+        diff = diff_int.to_bytes(seq_len - period, "big").translate(_NONZERO_TABLE)
+
+        ## A run of r zeros is a repeat of (r + period) // period whole copies,
+        ## so skip runs too short to at least tie the best so far
+        min_run = max(period, max_len - period)
+        zeros = bytes(min_run)
+        start = diff.find(zeros)
+        while start != -1:
+            end = diff.find(b"\x01", start + min_run)
+            if end == -1:
+                end = len(diff)
+            length = (end - start + period) // period * period
+            if length > max_len or (length == max_len and start < best_start):
+                unit = seq[start:start + period]
+                if len(set(unit)) > 1:
+                    max_len = length
+                    max_rep = seq[start:start + length]
+                    max_unit = unit
+                    best_start = start
+            start = diff.find(zeros, end)
+
+    return [max_len, max_rep, max_unit]
+
+class PackedSeq:
+    """ A DNA sequence stored at 2 bits per base, with non-ACGT runs kept aside """
+    __slots__ = ("length", "packed", "runs", "run_starts")
+
+    def __init__(self, seq: str) -> None:
+        '''Constructor; packs seq (case-insensitive, stored as uppercase). Each
+        run of a repeated non-ACGT character is stored as (start, end, char)
+        and packed as A underneath.'''
+        data = seq.upper().encode("ascii", "replace")
+        self.length = len(data)
+        ## tuples rather than lists, so records without runs share the empty tuple
+        runs = list()
+        for match in _AMBIGUOUS_RUN_RE.finditer(data):
+            runs.append((match.start(), match.end(), chr(data[match.start()])))
+        self.runs = tuple(runs)
+        self.run_starts = tuple([run[0] for run in runs])
+
+        ## Pad to a whole number of bytes, then combine the four base slots of
+        ## every byte at once with big-integer arithmetic (no carries, as each
+        ## byte of the result stays below 256)
+        codes = data.translate(_CODE_TABLE).replace(b"\x04", b"\x00")
+        codes = codes + bytes(-len(codes) % 4)
+        packed_int = 0
+        for slot in range(0, 4):
+            packed_int = packed_int * 4 + int.from_bytes(codes[slot::4], "big")
+        self.packed = packed_int.to_bytes(len(codes) // 4, "big")
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __str__(self) -> str:
+        return self[0:self.length]
+
+    def __repr__(self) -> str:
+        return f"PackedSeq({len(self)} bases)"
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, PackedSeq):
+            return self.length == other.length and self.packed == other.packed and self.runs == other.runs
+        return str(self) == other
+
+    def __iter__(self):
+        '''Yields one base at a time, unpacking 64 kb at a time'''
+        for start in range(0, self.length, 65536):
+            yield from self[start:start + 65536]
+
+    def __getitem__(self, index):
+        '''Indexing and slicing return str, as they would for a str sequence'''
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self.length)
+            if step != 1:
+                ## extended slices are rare; unpack and slice the whole string
+                return str(self)[index]
+            if start >= stop:
+                return ""
+            letters = self._raw_codes(start, stop).translate(_DECODE_TABLE)
+            for run_start, run_end, char in self._runs_overlapping(start, stop):
+                run_start = max(run_start, start)
+                run_end = min(run_end, stop)
+                letters[run_start - start:run_end - start] = char.encode() * (run_end - run_start)
+            return letters.decode()
+
+        if index < 0:
+            index = index + self.length
+        if index < 0 or index >= self.length:
+            raise IndexError("PackedSeq index out of range")
+        return self[index:index + 1]
+
+    def codes(self, start: int = 0, end: int = None) -> bytes:
+        '''Returns one code per base from start to end: 0-3 for A/C/G/T and 4
+        for any other character, as encode_2bit() does for a str.'''
+        if end is None or end > self.length:
+            end = self.length
+        if start >= end:
+            return b""
+        codes = self._raw_codes(start, end)
+        for run_start, run_end, char in self._runs_overlapping(start, end):
+            run_start = max(run_start, start)
+            run_end = min(run_end, end)
+            codes[run_start - start:run_end - start] = b"\x04" * (run_end - run_start)
+        return bytes(codes)
+
+    def base_counts(self, bases: str = BASES) -> dict[str,int]:
+        '''Returns a dictionary of counts for each of the (uppercase) bases,
+        computed from the packed bytes without unpacking them.'''
+        code_counts = [sum(self.packed.translate(table)) for table in _CODE_COUNT_TABLES]
+        ## padding and non-ACGT runs are packed as A (code 0)
+        code_counts[0] = code_counts[0] - (len(self.packed) * 4 - self.length)
+        run_counts = dict()
+        for run_start, run_end, char in self.runs:
+            code_counts[0] = code_counts[0] - (run_end - run_start)
+            run_counts[char] = run_counts.get(char, 0) + (run_end - run_start)
+
+        counts = dict()
+        for base in bases:
+            base = base.upper()
+            if base in "ACGT":
+                counts[base] = code_counts["ACGT".index(base)]
+            else:
+                counts[base] = run_counts.get(base, 0)
+        return counts
+
+    def _raw_codes(self, start: int, end: int) -> bytearray:
+        '''Unpacks the 2-bit codes of bases start to end (non-ACGT runs read as A)'''
+        first_byte = start // 4
+        chunk = self.packed[first_byte:(end + 3) // 4]
+        codes = bytearray(len(chunk) * 4)
+        for slot in range(0, 4):
+            codes[slot::4] = chunk.translate(_UNPACK_TABLES[slot])
+        offset = first_byte * 4
+        return codes[start - offset:end - offset]
+
+    def _runs_overlapping(self, start: int, end: int) -> list:
+        '''Returns the non-ACGT runs that overlap bases start to end'''
+        index = max(bisect.bisect_right(self.run_starts, start) - 1, 0)
+        overlapping = list()
+        while index < len(self.runs) and self.runs[index][0] < end:
+            if self.runs[index][1] > start:
+                overlapping.append(self.runs[index])
+            index = index + 1
+        return overlapping
+
+## Translation table mapping G and C (either case) to 1, everything else to 0
+_GC_TABLE = bytearray(256)
+for _base in b"GCgc":
+    _GC_TABLE[_base] = 1
+_GC_TABLE = bytes(_GC_TABLE)
+
+def window_offsets(seq_len: int, window_size: int, step_size: int):
+    '''Generator yielding (start, end) for every full window of window_size
+    in a sequence of length seq_len, starting at 0 and every step_size after'''
+    assert window_size > 0 and step_size > 0, "Error: window and step sizes must be positive"
+    for start in range(0, seq_len - window_size + 1, step_size):
+        yield (start, start + window_size)
+
+class SlidingWindows:
+    """ Full windows of a sequence, yielded as (start, end) offsets or as
+    zero-copy memoryviews, with GC and (optionally) k-mer counts kept up to
+    date as the window slides: each one-base step adds and removes one base
+    and one k-mer, so stepping costs O(step) rather than O(window). """
+    def __init__(self, seq: str, window_size: int, step_size: int = 1, k: int = None) -> None:
+        '''Constructor; with k given, kmer_counts[code] counts each k-mer 
+        (by KmerCounter code) of the current window'''
+        assert window_size > 0 and step_size > 0, "Error: window and step sizes must be positive"
+        assert k is None or 1 <= k <= min(MAX_K, window_size), f"Error: k must be between 1 and {MAX_K} and fit in a window"
+        if isinstance(seq, PackedSeq):
+            seq = str(seq)
+        self.buffer = seq.encode("ascii", "replace")
+        self.window_size = window_size
+        self.step_size = step_size
+        self.k = k
+        self.gc_flags = self.buffer.translate(_GC_TABLE)
+        self.codes = self.buffer.translate(_CODE_TABLE)
+
+        ## state of the current window [start, end)
+        self.start = 0
+        self.end = 0
+        self.gc_count = 0
+        self.distinct_kmers = 0
+        if k is not None:
+            self.kmer_counts = kmer_count_slots(k)
+
+    def gc_fraction(self) -> float:
+        '''Fraction of G/C bases in the current window'''
+        return self.gc_count / self.window_size
+
+    def has_kmer(self, kmer: str) -> bool:
+        '''Returns True if the current window contains kmer'''
+        code = 0
+        for base_code in encode_2bit(kmer):
+            assert base_code < 4, f"Error: not an ACGT k-mer: {kmer}"
+            code = (code << 2) | base_code
+        return self.kmer_counts[code] > 0
+
+    def view(self) -> memoryview:
+        '''The current window, as a view into the encoded sequence (no copy)'''
+        return memoryview(self.buffer)[self.start:self.end]
+
+    def views(self):
+        '''Generator yielding each window as a memoryview (see windows())'''
+        for start, end in self.windows():
+            yield self.view()
+
+    def windows(self):
+        '''Generator yielding (start, end) of each full window; while a window
+        is current, gc_count, gc_fraction(), kmer_counts, distinct_kmers and
+        has_kmer() describe it.'''
+        window_size = self.window_size
+        step_size = self.step_size
+        for start, end in window_offsets(len(self.buffer), window_size, step_size):
+            if start == 0 or step_size >= window_size:
+                self._fill(start)
+            else:
+                for i in range(0, step_size):
+                    self._slide()
+            yield (start, end)
+
+    def _fill(self, start: int) -> None:
+        '''Sets up the window at start from scratch, in O(window)'''
+        end = start + self.window_size
+        self.gc_count = self.gc_flags.count(1, start, end)
+        if self.k is not None:
+            if self.end > 0:
+                ## empty the counts of the previous window (cheaper than a reset)
+                for code in self._window_kmer_codes(self.start, self.end):
+                    self.kmer_counts[code] = 0
+            self.distinct_kmers = 0
+            for code in self._window_kmer_codes(start, end):
+                if self.kmer_counts[code] == 0:
+                    self.distinct_kmers = self.distinct_kmers + 1
+                self.kmer_counts[code] = self.kmer_counts[code] + 1
+            ## rolling k-mer codes of the leaving (start) and entering (end)
+            ## edges, each primed with the k - 1 bases before its first k-mer
+            self._leaving = rolling_kmer_codes(memoryview(self.codes)[start:], self.k)
+            self._entering = rolling_kmer_codes(memoryview(self.codes)[end - self.k + 1:], self.k)
+            for i in range(0, self.k - 1):
+                next(self._leaving)
+                next(self._entering)
+        self.start = start
+        self.end = end
+
+    def _slide(self) -> None:
+        '''Moves the window one base to the right, in O(1)'''
+        start = self.start
+        end = self.end
+        self.gc_count = self.gc_count + self.gc_flags[end] - self.gc_flags[start]
+        k = self.k
+        if k is not None:
+            kmer_counts = self.kmer_counts
+
+            ## the k-mer at start leaves, the k-mer ending at end enters
+            code, run = next(self._leaving)
+            if run >= k:
+                kmer_counts[code] = kmer_counts[code] - 1
+                if kmer_counts[code] == 0:
+                    self.distinct_kmers = self.distinct_kmers - 1
+            code, run = next(self._entering)
+            if run >= k:
+                if kmer_counts[code] == 0:
+                    self.distinct_kmers = self.distinct_kmers + 1
+                kmer_counts[code] = kmer_counts[code] + 1
+        self.start = start + 1
+        self.end = end + 1
+
+    def _window_kmer_codes(self, start: int, end: int):
+        '''Generator yielding the code of each ACGT-only k-mer in [start, end)'''
+        k = self.k
+        for code, run in rolling_kmer_codes(memoryview(self.codes)[start:end], k):
+            if run >= k:
+                yield code
+
+## IUPAC nucleotide codes and the bases each stands for
+IUPAC_BASES = {"A": "A", "C": "C", "G": "G", "T": "T", "U": "T",
+               "R": "AG", "Y": "CT", "S": "CG", "W": "AT", "K": "GT", "M": "AC",
+               "B": "CGT", "D": "AGT", "H": "ACT", "V": "ACG", "N": "ACGT"}
+
+def motif_base_sets(motif: str) -> list[str]:
+    '''Given a motif of IUPAC codes and/or bracketed base classes (e.g. 
+    "WGATAR" or "[AT]GATA[GA]"), returns the bases allowed at each position'''
+    base_sets = list()
+    for token in re.findall(r"\[[^\]]*\]|.", motif.upper()):
+        if token[0] == "[":
+            bases = "".join(IUPAC_BASES[code] for code in token[1:-1])
+        else:
+            assert token in IUPAC_BASES, f"Error: not an IUPAC code in motif {motif}: {token}"
+            bases = IUPAC_BASES[token]
+        base_sets.append("".join(sorted(set(bases))))
+    assert len(base_sets) > 0, "Error: empty motif"
+    return base_sets
+
+def expand_motif(motif: str) -> list[str]:
+    '''Returns every plain A/C/G/T string matched by an IUPAC motif'''
+    return ["".join(bases) for bases in itertools.product(*motif_base_sets(motif))]
+
+class MotifScanner:
+    """ Counts a whole set of IUPAC motifs in one pass over a sequence, with
+    an Aho-Corasick automaton built over every expansion of every motif (and
+    of its reverse complement). Overlapping hits are all counted. """
+    def __init__(self, motifs: list[str], both_strands: bool = True) -> None:
+        '''Constructor; with both_strands=True a motif's count includes hits
+        of its reverse complement (so a palindromic site counts twice)'''
+        self.motifs = list(motifs)
+        self.both_strands = both_strands
+
+        ## Trie of all expanded patterns; outputs[state] lists motif indexes
+        goto = [[-1] * 4]
+        outputs = [list()]
+        for motif_index, motif in enumerate(self.motifs):
+            patterns = expand_motif(motif)
+            if both_strands:
+                patterns = patterns + [reverse_complement(pattern) for pattern in patterns]
+            for pattern in patterns:
+                state = 0
+                for code in encode_2bit(pattern):
+                    if goto[state][code] == -1:
+                        goto[state][code] = len(goto)
+                        goto.append([-1] * 4)
+                        outputs.append(list())
+                    state = goto[state][code]
+                outputs[state].append(motif_index)
+
+        ## Breadth-first, fill in every missing transition from the failure
+        ## links (a full DFA), and inherit the failure state's outputs
+        fail = [0] * len(goto)
+        queue = collections.deque()
+        for code in range(0, 4):
+            if goto[0][code] == -1:
+                goto[0][code] = 0
+            else:
+                queue.append(goto[0][code])
+        while len(queue) > 0:
+            state = queue.popleft()
+            outputs[state] = outputs[state] + outputs[fail[state]]
+            for code in range(0, 4):
+                next_state = goto[state][code]
+                if next_state == -1:
+                    goto[state][code] = goto[fail[state]][code]
+                else:
+                    fail[next_state] = goto[fail[state]][code]
+                    queue.append(next_state)
+
+        ## Flat transition table indexed by 5 * state + code; code 4 (not 
+        ## ACGT) returns to the root. States are stored pre-multiplied by 5.
+        self.transitions = list()
+        self.outputs = list()
+        for state in range(0, len(goto)):
+            self.transitions.extend([5 * next_state for next_state in goto[state]] + [0])
+            self.outputs.extend([tuple(outputs[state])] + [()] * 4)
+
+    def count(self, seq: str) -> list[int]:
+        '''Returns the number of hits of each motif in seq (case-insensitive),
+        in the order the motifs were given'''
+        counts = [0] * len(self.motifs)
+        transitions = self.transitions
+        outputs = self.outputs
+        state = 0
+        for code in encode_2bit(seq):
+            state = transitions[state + code]
+            if outputs[state]:
+                for motif_index in outputs[state]:
+                    counts[motif_index] = counts[motif_index] + 1
+        return counts
+
+if __name__ == "__main__":      #only run tests when script is executed, not imported
+    print(f"{__file__.split('/')[-1]} was executed.\n\tRunning tests...\n")
+
+    assert kmer_to_str(0b00011011, 4) == "ACGT", "Failed Test"
+    assert revcomp_code(0b0000, 2) == 0b1111, "Failed Test"    ## AA <-> TT
+
+    ## ties go to the first k-mer seen; N breaks windows
+    assert most_common_kmer("GGACGTACGTNACGT", 4) == ["ACGT", 3], "Failed Test"
+    assert most_common_kmer("TACAG", 2) == ["TA", 1], "Failed Test"
+    assert most_common_kmer("ACG", 5) == ["", 0], "Failed Test"
+
+    ## canonical mode merges AAC with its reverse complement GTT
+    assert most_common_kmer("AACAGTT", 3, canonical = True) == ["AAC", 2], "Failed Test"
+
+    ## a reused counter only resets the slots the previous record touched
+    counter = KmerCounter(12, canonical = True)
+    assert counter.most_common("CCCCCCCCCCCCC") == ["CCCCCCCCCCCC", 2], "Failed Test"
+    assert counter.most_common("TTTTTTTTTTTTTT") == ["AAAAAAAAAAAA", 3], "Failed Test"
+    assert sum(counter.counts) == 3, "Failed Test"
+    print("Passed k-mer tests!")
+
+    ## the lazy regex consumed ACACAC first here and reported only GACGACGAC
+    assert longest_perfect_repeat("TTACACACGACGACGACGTT") == [12, "ACGACGACGACG", "ACG"], "Failed Test"
+    assert longest_perfect_repeat("GATCATCATTTTTTTTTT") == [6, "ATCATC", "ATC"], "Failed Test"
+    assert longest_perfect_repeat("AAAAAAAA") == [1, "A", "A"], "Failed Test"
+    print("Passed repeat tests!")
+
+    assert base_counts("ACgtNNa") == {"A": 2, "C": 1, "G": 1, "T": 1, "N": 2}, "Failed Test"
+    assert gc_content("GCat") == 0.5, "Failed Test"
+    assert batch_base_counts(["A", "cc"])[1]["C"] == 2, "Failed Test"
+    print("Passed composition tests!")
+
+    packed = PackedSeq("ACGTTnnNGCaRYA")
+    assert str(packed) == "ACGTTNNNGCARYA" and len(packed) == 14, "Failed Test"
+    assert packed[3:9] == "TTNNNG" and packed[-1] == "A" and packed[::5] == "ANA", "Failed Test"
+    assert base_counts(packed) == base_counts("ACGTTNNNGCARYA"), "Failed Test"
+    assert encode_2bit(packed) == encode_2bit("ACGTTNNNGCARYA"), "Failed Test"
+    assert most_common_kmer(packed, 2) == most_common_kmer("ACGTTNNNGCARYA", 2), "Failed Test"
+    print("Passed packed sequence tests!")
+
+    assert motif_base_sets("[AT]GATA[GA]") == motif_base_sets("WGATAR") == ["AT", "G", "A", "T", "A", "AG"], "Failed Test"
+    assert sorted(expand_motif("RN")) == ["AA", "AC", "AG", "AT", "GA", "GC", "GG", "GT"], "Failed Test"
+    ## GATA overlaps itself in GATAGATA; TATC is GATA on the reverse strand
+    scanner = MotifScanner(["GATA", "ATAG", "WGATAR"])
+    assert scanner.count("AGATAGATAxtatc") == [3, 1, 1], "Failed Test"
+    assert MotifScanner(["GATA"], both_strands = False).count("GATAGATATATC") == [2], "Failed Test"
+    assert MotifScanner(["GATC"]).count("GATC") == [2], "Failed Test"     ## palindrome, both strands
+    assert MotifScanner(["AA"], both_strands = False).count("AAAA") == [3], "Failed Test"
+    print("Passed motif scanning tests!")
+
+    ## sliding stats match recounting every window from scratch
+    window_seq = "ACGGTAGNCCTGCAACGTTG"
+    for window_size, step_size in [(6, 1), (6, 4), (5, 7)]:
+        sliding = SlidingWindows(window_seq, window_size, step_size, k = 2)
+        for start, end in sliding.windows():
+            window = window_seq[start:end]
+            assert sliding.gc_count == window.count("G") + window.count("C"), "Failed Test"
+            assert sliding.view() == window.encode(), "Failed Test"
+            kmers = set(window[i:i + 2] for i in range(0, len(window) - 1) if "N" not in window[i:i + 2])
+            assert sliding.distinct_kmers == len(kmers) and all(sliding.has_kmer(kmer) for kmer in kmers), "Failed Test"
+    assert list(window_offsets(11, 3, 5)) == [(0, 3), (5, 8)], "Failed Test"
+    print("Passed sliding window tests!")
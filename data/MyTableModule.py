@@ -0,0 +1,380 @@
+#!/usr/bin/env Python
+
+""" Personal module for filtering tab-delimited tables by key. """
+import os
+import zlib
+import heapq
+import shutil
+import argparse
+import operator
+import itertools
+import tempfile
+import collections
+import multiprocessing
+from array import array
+
+TABLE_BUFFER_SIZE = 1 << 20
+
+## Keys held in memory before join_by_key() switches to a
+## partitioned, on-disk join (a set of short bytes keys costs ~100 bytes each)
+MAX_IN_MEMORY_KEYS = 10_000_000
+JOIN_PARTITIONS = 64
+
+## Largest byte range parallel_filter_by_key() gives one task, so that each
+## task's matched lines (pickled back in one piece) stay tens of MB at most
+FILTER_RANGE_SIZE = 32 << 20
+
+def first_field(line: bytes) -> bytes:
+    '''Returns the first tab-delimited field of line.strip(), without copying
+    or splitting the rest of the line.'''
+    if line[:1].isspace():
+        line = line.lstrip()
+    tab = line.find(b"\t")
+    if tab == -1:
+        return line.rstrip()
+    return line[:tab]
+
+def column_list(value: str) -> list[int]:
+    '''argparse type: a comma-separated list of 1-based columns, returned 0-based'''
+    columns = [int(column) - 1 for column in value.split(",")]
+    if min(columns) < 0:
+        raise argparse.ArgumentTypeError("columns are numbered from 1")
+    return columns
+
+def key_function(columns: list[int]):
+    '''Returns a function mapping a bytes line to its key: the given 0-based
+    columns of line.strip(), joined by tabs (a composite key), or None if the
+    line has too few columns. Keys on column 0 alone use first_field().'''
+    columns = list(columns)
+    if columns == [0]:
+        return first_field
+    last_column = max(columns)
+
+    def key_of(line: bytes) -> bytes:
+        ## split no further than the last column needed
+        fields = line.strip().split(b"\t", last_column + 1)
+        if len(fields) <= last_column:
+            return None
+        if len(columns) == 1:
+            return fields[columns[0]]
+        return b"\t".join([fields[column] for column in columns])
+    return key_of
+
+def filter_by_key(search_filename: str, keys: set[bytes], out, columns: list[int] = (0,)) -> int:
+    '''Writes line.strip() (plus a newline) for each line of the search file
+    whose key on the given columns is in keys to the binary stream out, in
+    file order. Returns the number of lines written.'''
+    key_of = key_function(columns)
+    num_written = 0
+    with open(search_filename, "rb", buffering = TABLE_BUFFER_SIZE) as fhandle:
+        for line in fhandle:
+            if key_of(line) in keys:
+                out.write(line.strip() + b"\n")
+                num_written = num_written + 1
+    return num_written
+
+def line_aligned_ranges(filename: str, parts: int) -> list[tuple[int,int]]:
+    '''Splits a file into up to parts (start, end) byte ranges of roughly
+    equal size, with every boundary moved forward to the start of a line.'''
+    file_size = os.path.getsize(filename)
+    boundaries = [0]
+    with open(filename, "rb") as fhandle:
+        for part in range(1, parts):
+            target = max(part * file_size // parts, boundaries[-1])
+            if target > 0:
+                ## finish the line that target falls in (unless target is a line start)
+                fhandle.seek(target - 1)
+                fhandle.readline()
+            boundaries.append(fhandle.tell())
+    boundaries.append(file_size)
+    return [(boundaries[i], boundaries[i + 1]) for i in range(0, parts) if boundaries[i] < boundaries[i + 1]]
+
+## The key set seen by filter_range() in worker processes; forked workers
+## inherit it copy-on-write, other start methods get it from _set_shared_keys()
+_shared_keys = None
+
+def _set_shared_keys(keys: set[bytes]) -> None:
+    global _shared_keys
+    _shared_keys = keys
+
+def filter_range(search_filename: str, start: int, end: int, columns: list[int]) -> bytes:
+    '''Worker task for parallel_filter_by_key(): returns the stripped,
+    newline-terminated matching lines that start at byte offsets 
+    start <= offset < end (start must be the start of a line).'''
+    key_of = key_function(columns)
+    keys = _shared_keys
+    matched_lines = list()
+    with open(search_filename, "rb", buffering = TABLE_BUFFER_SIZE) as fhandle:
+        fhandle.seek(start)
+        offset = start
+        for line in fhandle:
+            if offset >= end:
+                break
+            offset = offset + len(line)
+            if key_of(line) in keys:
+                matched_lines.append(line.strip())
+    if len(matched_lines) == 0:
+        return b""
+    return b"\n".join(matched_lines) + b"\n"
+
+def _filter_range_task(task: tuple) -> bytes:
+    return filter_range(*task)
+
+def parallel_filter_by_key(search_filename: str, keys: set[bytes], out, columns: list[int] = (0,),
+                           jobs: int = 2) -> int:
+    '''Same output as filter_by_key(), with the search file split into 
+    line-aligned byte ranges (at least 4 per job, at most about
+    FILTER_RANGE_SIZE bytes each) that jobs worker processes filter against
+    the read-only key set. Results are written in input order as each range
+    finishes. Returns the number of lines written.'''
+    global _shared_keys
+    parts = max(4 * jobs, os.path.getsize(search_filename) // FILTER_RANGE_SIZE)
+    ranges = line_aligned_ranges(search_filename, parts)
+    if multiprocessing.get_start_method() == "fork":
+        _shared_keys = keys
+        pool = multiprocessing.Pool(jobs)
+    else:
+        pool = multiprocessing.Pool(jobs, _set_shared_keys, (keys,))
+    num_written = 0
+    with pool:
+        tasks = [(search_filename, start, end, list(columns)) for start, end in ranges]
+        for matched in pool.imap(_filter_range_task, tasks):
+            out.write(matched)
+            num_written = num_written + matched.count(b"\n")
+    _shared_keys = None
+    return num_written
+
+def partition_of(key: bytes, partitions: int) -> int:
+    '''Stable (across processes and runs) partition number for a key'''
+    return zlib.crc32(key) % partitions
+
+def partitioned_join(key_lines, keys: set[bytes], search_filename: str, out,
+                     key_columns: list[int] = (0,), search_columns: list[int] = (0,),
+                     partitions: int = JOIN_PARTITIONS, tmp_dir: str = None) -> int:
+    '''Out-of-core version of filter_by_key(): keys (already read) and the
+    keys of the remaining key_lines are hashed into partition files, as are
+    the (byte offset, key) pairs of the search file. Each partition's keys 
+    are then loaded on their own, and the offsets of matching search lines 
+    are merged back into file order and written out in one sequential pass.
+    Only one partition's keys are in memory at a time. Returns the number of
+    lines written.'''
+    key_of = key_function(key_columns)
+    search_key_of = key_function(search_columns)
+    with tempfile.TemporaryDirectory(dir = tmp_dir) as work_dir:
+        key_paths = [os.path.join(work_dir, f"keys.{p}") for p in range(0, partitions)]
+        search_paths = [os.path.join(work_dir, f"search.{p}") for p in range(0, partitions)]
+
+        key_handles = [open(path, "wb", buffering = TABLE_BUFFER_SIZE // 16) for path in key_paths]
+        for key in keys:
+            key_handles[partition_of(key, partitions)].write(key + b"\n")
+        keys.clear()
+        for line in key_lines:
+            key = key_of(line)
+            if key is not None:
+                key_handles[partition_of(key, partitions)].write(key + b"\n")
+        for key_handle in key_handles:
+            key_handle.close()
+
+        search_handles = [open(path, "wb", buffering = TABLE_BUFFER_SIZE // 16) for path in search_paths]
+        with open(search_filename, "rb", buffering = TABLE_BUFFER_SIZE) as fhandle:
+            offset = 0
+            for line in fhandle:
+                key = search_key_of(line)
+                if key is not None:
+                    search_handles[partition_of(key, partitions)].write(b"%d\t%s\n" % (offset, key))
+                offset = offset + len(line)
+        for search_handle in search_handles:
+            search_handle.close()
+
+        ## each partition's matching offsets come out in increasing order
+        matched_offsets = list()
+        for p in range(0, partitions):
+            with open(key_paths[p], "rb") as key_handle:
+                partition_keys = set(line[:-1] for line in key_handle)
+            partition_offsets = array("q")
+            with open(search_paths[p], "rb") as search_handle:
+                for line in search_handle:
+                    offset, key = line[:-1].split(b"\t", 1)
+                    if key in partition_keys:
+                        partition_offsets.append(int(offset))
+            matched_offsets.append(partition_offsets)
+            os.remove(key_paths[p])
+            os.remove(search_paths[p])
+
+    num_written = 0
+    with open(search_filename, "rb", buffering = TABLE_BUFFER_SIZE) as fhandle:
+        offset = 0
+        wanted_offsets = heapq.merge(*matched_offsets)
+        wanted_offset = next(wanted_offsets, None)
+        for line in fhandle:
+            if wanted_offset is None:
+                break
+            if offset == wanted_offset:
+                out.write(line.strip() + b"\n")
+                num_written = num_written + 1
+                wanted_offset = next(wanted_offsets, None)
+            offset = offset + len(line)
+    return num_written
+
+def join_by_key(key_lines, search_filename: str, out, key_columns: list[int] = (0,),
+                search_columns: list[int] = (0,), max_keys: int = MAX_IN_MEMORY_KEYS,
+                tmp_dir: str = None, jobs: int = 1) -> int:
+    '''Writes each line of the search file whose key (search_columns) matches
+    the key (key_columns) of any of key_lines (an iterable of bytes lines) to
+    the binary stream out, stripped, in search-file order. Columns are 0-based
+    and several columns form a composite key. Keys are kept in a set of 
+    bytes and, with jobs > 1, the search file is filtered in parallel. Once
+    more than max_keys distinct keys have been read, the join falls back to
+    partitioned_join() (single process), using temporary files in tmp_dir.
+    Returns the number of lines written.'''
+    assert len(key_columns) == len(search_columns), "Error: key and search column counts differ"
+    key_of = key_function(key_columns)
+    keys = set()
+    key_lines = iter(key_lines)
+    for line in key_lines:
+        key = key_of(line)
+        if key is not None:
+            keys.add(key)
+            if len(keys) > max_keys:
+                return partitioned_join(key_lines, keys, search_filename, out, key_columns, search_columns,
+                                        tmp_dir = tmp_dir)
+    if jobs > 1:
+        return parallel_filter_by_key(search_filename, keys, out, search_columns, jobs)
+    return filter_by_key(search_filename, keys, out, search_columns)
+
+def block_chunks(fhandle, block_size: int = TABLE_BUFFER_SIZE):
+    '''Generator reading a binary stream in blocks of block_size bytes and
+    yielding, per block, the complete lines in it as one bytes chunk, minus
+    the chunk's final newline. A final line without a newline is yielded on
+    its own.'''
+    partial_line = b""
+    while True:
+        block = fhandle.read(block_size)
+        if len(block) == 0:
+            break
+        last_newline = block.rfind(b"\n")
+        if last_newline == -1:
+            partial_line = partial_line + block
+        else:
+            yield partial_line + block[:last_newline]
+            partial_line = block[last_newline + 1:]
+    if len(partial_line) > 0:
+        yield partial_line
+
+def write_count_run(counts: dict[bytes,int], filename: str) -> None:
+    '''Writes key counts to a run file as "count<tab>key" lines, sorted by key'''
+    with open(filename, "wb", buffering = TABLE_BUFFER_SIZE) as run_handle:
+        for key, count in sorted(counts.items()):
+            run_handle.write(b"%d\t%s\n" % (count, key))
+
+def read_count_run(filename: str):
+    '''Generator yielding (key, count) pairs from a run file, in key order'''
+    with open(filename, "rb", buffering = TABLE_BUFFER_SIZE) as run_handle:
+        for line in run_handle:
+            count, key = line[:-1].split(b"\t", 1)
+            yield (key, int(count))
+
+def merge_count_runs(runs):
+    '''Given iterables of (key, count) pairs, each sorted by key, yields
+    (key, total count) pairs in key order'''
+    merged = heapq.merge(*runs, key = operator.itemgetter(0))
+    for key, pairs in itertools.groupby(merged, key = operator.itemgetter(0)):
+        yield (key, sum(count for key, count in pairs))
+
+def count_keys(fhandle, columns: list[int] = (0,), max_keys: int = MAX_IN_MEMORY_KEYS,
+               tmp_dir: str = None):
+    '''Generator yielding (key, count) pairs for the keys (see key_function())
+    of the lines of a binary stream; lines with too few columns are skipped.
+    The stream is read in blocks, and each block's keys are counted by a 
+    Counter in C. While at most max_keys distinct keys have been seen, pairs
+    come out in first-seen order; past that, counts are spilled to sorted 
+    run files in tmp_dir, merged at the end, and pairs come out in key order.'''
+    key_of = key_function(columns)
+    counts = collections.Counter()
+    run_filenames = list()
+    work_dir = None
+    try:
+        for chunk in block_chunks(fhandle):
+            counts.update(map(key_of, chunk.split(b"\n")))
+            if len(counts) > max_keys:
+                counts.pop(None, None)
+                if work_dir is None:
+                    work_dir = tempfile.mkdtemp(dir = tmp_dir)
+                run_filenames.append(os.path.join(work_dir, f"run.{len(run_filenames)}"))
+                write_count_run(counts, run_filenames[-1])
+                counts.clear()
+        counts.pop(None, None)
+
+        if len(run_filenames) == 0:
+            yield from counts.items()
+        else:
+            runs = [read_count_run(run_filename) for run_filename in run_filenames]
+            runs.append(sorted(counts.items()))
+            yield from merge_count_runs(runs)
+    finally:
+        if work_dir is not None:
+            shutil.rmtree(work_dir)
+
+def top_counts(key_counts, k: int) -> list[tuple[bytes,int]]:
+    '''Returns the k (key, count) pairs with the highest counts, highest 
+    first (ties in input order), using a heap of size k rather than a sort'''
+    return heapq.nlargest(k, key_counts, key = operator.itemgetter(1))
+
+if __name__ == "__main__":      #only run tests when script is executed, not imported
+    import io
+    print(f"{__file__.split('/')[-1]} was executed.\n\tRunning tests...\n")
+
+    assert first_field(b"id1\tx\ty\n") == b"id1", "Failed Test"
+    assert first_field(b"  id1\tx\n") == b"id1", "Failed Test"
+    assert first_field(b"id1  \r\n") == b"id1", "Failed Test"
+    assert first_field(b"\n") == b"", "Failed Test"
+    print("Passed field tests!")
+
+    fd, test_filename = tempfile.mkstemp(suffix = ".txt")
+    with os.fdopen(fd, "wb") as fhandle:
+        fhandle.write(b"b\t2\na\t1\n c\t3 \nb\t4\nd\n")
+    key_lines = [b"b\n", b"c\tignored\n", b"e\n"]
+    expected = b"b\t2\nc\t3\nb\t4\n"
+
+    out = io.BytesIO()
+    assert join_by_key(key_lines, test_filename, out) == 3, "Failed Test"
+    assert out.getvalue() == expected, "Failed Test"
+
+    ## max_keys = 1 forces the partitioned join, which must give the same lines
+    out = io.BytesIO()
+    assert join_by_key(key_lines, test_filename, out, max_keys = 1) == 3, "Failed Test"
+    assert out.getvalue() == expected, "Failed Test"
+
+    ## with jobs = 2 the ranges are filtered in worker processes, output stays in order
+    out = io.BytesIO()
+    assert join_by_key(key_lines, test_filename, out, jobs = 2) == 3, "Failed Test"
+    assert out.getvalue() == expected, "Failed Test"
+
+    ## a tiny FILTER_RANGE_SIZE splits the file into more (bounded) ranges than 4 per job
+    FILTER_RANGE_SIZE = 4
+    out = io.BytesIO()
+    assert parallel_filter_by_key(test_filename, {b"b", b"c"}, out, jobs = 1) == 3, "Failed Test"
+    assert out.getvalue() == expected, "Failed Test"
+    FILTER_RANGE_SIZE = 32 << 20
+
+    ## composite key: column 1 of the key lines against columns 2 and 1 of the search file
+    assert key_function([1, 0])(b"a\tb\tc\n") == b"b\ta", "Failed Test"
+    assert key_function([2])(b"a\tb\n") is None, "Failed Test"
+    out = io.BytesIO()
+    assert join_by_key([b"x\t4\tb\n", b"y\t3\n"], test_filename, out, [1, 2], [1, 0]) == 1, "Failed Test"
+    assert out.getvalue() == b"b\t4\n", "Failed Test"
+    out = io.BytesIO()
+    assert join_by_key([b"x\t4\tb\n"], test_filename, out, [1, 2], [1, 0], max_keys = 0) == 1, "Failed Test"
+    assert out.getvalue() == b"b\t4\n", "Failed Test"
+    os.remove(test_filename)
+    print("Passed join tests!")
+
+    ## Counting: blocks of 4 bytes split lines across blocks; the in-memory
+    ## counts keep first-seen order, spilled ones (max_keys = 1) key order
+    stream = io.BytesIO(b"b\tGO:1\na\tGO:2\nb\tGO:1\nc\nb")
+    assert list(block_chunks(stream, 4))[-2:] == [b"b\tGO:1\nc", b"b"], "Failed Test"
+    assert list(count_keys(io.BytesIO(stream.getvalue()))) == [(b"b", 3), (b"a", 1), (b"c", 1)], "Failed Test"
+    assert list(count_keys(io.BytesIO(stream.getvalue()), max_keys = 1)) == [(b"a", 1), (b"b", 3), (b"c", 1)], "Failed Test"
+    assert list(count_keys(io.BytesIO(stream.getvalue()), [1])) == [(b"GO:1", 2), (b"GO:2", 1)], "Failed Test"
+    assert top_counts(count_keys(io.BytesIO(stream.getvalue())), 2) == [(b"b", 3), (b"a", 1)], "Failed Test"
+    print("Passed counting tests!")
@@ -1,104 +1,686 @@
 #!/usr/bin/env Python
 
 """ Personal module for parsing VCF files. """
-import re
+import io
+import os
+import sys
+import json
+import gzip
+import bisect
+import multiprocessing
+from array import array
+import MyTableModule
 
 class SNP:
     """ A class representing simple SNPs"""   # Docstring
+    __slots__ = ("chrname", "pos", "snpid", "refallele", "altallele", "transition")
+
     def __init__(self, chrname, pos, snpid, refallele, altallele) -> None:
-        """ Constructor method """
+        """ Constructor method; strings are interned and the transition flag
+        is worked out once, here """
         assert refallele != altallele, "Error: ref == alt at pos " + str(pos)
-        self.chrname = chrname
+        self.chrname = sys.intern(chrname)
         self.pos = pos
         self.snpid = snpid
-        self.refallele = refallele
-        self.altallele = altallele
+        self.refallele = sys.intern(refallele)
+        self.altallele = sys.intern(altallele)
+        self.transition = _TRANSITION_PAIRS.get(refallele + altallele, 0) == 1
 
     def is_transition(self) -> bool:
         """ Returns True if refallele/altallele is A/G, G/A, C/T, or T/C """
-        if self.refallele == "G" or self.refallele == "A":
-            if self.altallele == "G" or self.altallele == "A":
-                return True
-        
-        if self.refallele == "C" or self.refallele == "T":
-            if self.altallele == "C" or self.altallele == "T":
-                return True
-
-        return False
+        return self.transition
 
     def is_transversion(self) -> bool:
         '''Returns True if the snp is a transversion (i.e., not a transition)
         False otherwise'''
-        if self.is_transition():
-            return False
-        return True
+        return not self.transition
+
+## Single-base allele codes for the columnar Chromosome; any other allele
+## (indels, multi-base or lowercase alleles) is coded OTHER_ALLELE and its
+## strings are kept on the side. A SNP's ref and alt codes are packed into
+## one byte as (ref_code << 3) | alt_code.
+ALLELE_CODES = {"A": 0, "C": 1, "G": 2, "T": 3}
+ALLELE_BASES = "ACGT"
+OTHER_ALLELE = 4
+
+VCF_BUFFER_SIZE = 1 << 20
+
+CACHE_SUFFIX = ".snpcache"
+CACHE_MAGIC = b"MyVCFModule cache 1\n"
+
+VCF_INDEX_SUFFIX = ".vidx"
+VCF_INDEX_BLOCK_SIZE = 16384
+
+## _TRANSITION_TABLE maps a packed ref/alt byte to 1 for A<->G and C<->T, else 0
+_TRANSITION_TABLE = bytearray(256)
+for _ref, _alt in (("A", "G"), ("G", "A"), ("C", "T"), ("T", "C")):
+    _TRANSITION_TABLE[(ALLELE_CODES[_ref] << 3) | ALLELE_CODES[_alt]] = 1
+_TRANSITION_TABLE = bytes(_TRANSITION_TABLE)
+
+## _TRANSITION_PAIRS maps ref + alt to 1 (transition) or 0 (transversion) for
+## every pair of distinct single bases; any other pair counts as a transversion
+_TRANSITION_PAIRS = dict()
+for _ref in ALLELE_BASES:
+    for _alt in ALLELE_BASES:
+        if _ref != _alt:
+            _TRANSITION_PAIRS[_ref + _alt] = _TRANSITION_TABLE[(ALLELE_CODES[_ref] << 3) | ALLELE_CODES[_alt]]
 
 class Chromosome:
-    """ A class representing a chromosome, which has a collection of SNPs """
+    """ A class representing a chromosome, which has a collection of SNPs,
+    stored column-wise: an array of positions, a bytearray of packed ref/alt
+    codes, and a list of interned SNP ids """
     def __init__(self, chrname: str) -> None:
         """ Constructor """
-        self.chrname = chrname
-        self.locations_to_snps = dict()
+        self.chrname = sys.intern(chrname)
+        self.positions = array("q")
+        self.alleles = bytearray()
+        self.snpids = list()
+        self.other_alleles = dict()     # row index -> (refallele, altallele)
+        self.max_pos = -1
+        self.is_sorted = True
+        self.transitions = 0            # running count, so count_transitions() is O(1)
+        ## Bitmap of used positions, only built once positions arrive out of order
+        self.position_bitmap = None
+
+    def __len__(self) -> int:
+        return len(self.positions)
 
     def get_name(self) -> str:
         """ Returns the chromosome name"""
         return self.chrname
     
     def add_snp(self, chrname, pos, snpid, refallele, altallele):
-        '''Given all necessary information to add a new SNP, create a new SNP object 
-        and add it to the SNPs dictionary. If a SNP already exists at that location, 
-        or the given chrname doesn't match self.chrname, an error is reported.'''
+        '''Given all necessary information to add a new SNP, append it to the 
+        columns. altallele may also be a list of ALT alleles (a multi-allelic 
+        site), which adds one row per allele at the same position. If a SNP 
+        already exists at that location, the given chrname doesn't match 
+        self.chrname, or refallele == altallele, an error is reported.'''
+        if isinstance(altallele, str):
+            altalleles = [altallele]
+        else:
+            altalleles = altallele
+
         ## If there is already an entry for that SNP, throw an error
-        open_location = not(pos in self.locations_to_snps)
+        open_location = pos > self.max_pos or self._position_is_open(pos)
         assert open_location, f"Duplicate SNP: {self.chrname}:{pos}"
         
         ## If the chrname doesn't match self.chrname, throw and error
         assert chrname == self.chrname, "Chr name mismatch!"
+        for altallele in altalleles:
+            assert refallele != altallele, "Error: ref == alt at pos " + str(pos)
+
+        ## Otherwise, append to the columns
+        if pos > self.max_pos:
+            self.max_pos = pos
+        else:
+            self.is_sorted = False
+        if self.position_bitmap is not None:
+            self._set_position_bit(pos)
 
-        ## Otherwise, create the SNP object and add it to the dictionary
-        newsnp = SNP(chrname, pos, snpid, refallele, altallele)
-        self.locations_to_snps[pos] = newsnp
+        snpid = sys.intern(snpid)
+        ref_code = ALLELE_CODES.get(refallele, OTHER_ALLELE)
+        for altallele in altalleles:
+            alt_code = ALLELE_CODES.get(altallele, OTHER_ALLELE)
+            if ref_code == OTHER_ALLELE or alt_code == OTHER_ALLELE:
+                self.other_alleles[len(self.positions)] = (sys.intern(refallele), sys.intern(altallele))
+            allele_byte = (ref_code << 3) | alt_code
+            self.positions.append(pos)
+            self.alleles.append(allele_byte)
+            self.snpids.append(snpid)
+            self.transitions = self.transitions + _TRANSITION_TABLE[allele_byte]
+
+    def _position_is_open(self, pos: int) -> bool:
+        '''Checks pos against the position bitmap, building it on first use'''
+        if self.position_bitmap is None:
+            self.position_bitmap = bytearray()
+            for used_pos in self.positions:
+                self._set_position_bit(used_pos)
+        byte_index = pos >> 3
+        if byte_index >= len(self.position_bitmap):
+            return True
+        return not (self.position_bitmap[byte_index] >> (pos & 7)) & 1
+
+    def _set_position_bit(self, pos: int) -> None:
+        byte_index = pos >> 3
+        if byte_index >= len(self.position_bitmap):
+            ## grow geometrically so sorted appends stay amortized O(1)
+            new_len = max(byte_index + 1, 2 * len(self.position_bitmap))
+            self.position_bitmap.extend(bytes(new_len - len(self.position_bitmap)))
+        self.position_bitmap[byte_index] = self.position_bitmap[byte_index] | (1 << (pos & 7))
+
+    def merge(self, other) -> None:
+        '''Appends all SNPs of another Chromosome of the same name (e.g. one
+        parsed from a later part of the file), applying the same duplicate
+        position check as add_snp().'''
+        assert other.chrname == self.chrname, "Chr name mismatch!"
+        if len(other.positions) == 0:
+            return
+        other_min_pos = min(other.positions)
+        if other_min_pos <= self.max_pos or self.position_bitmap is not None:
+            for pos in other.positions:
+                assert self._position_is_open(pos), f"Duplicate SNP: {self.chrname}:{pos}"
+            for pos in other.positions:
+                self._set_position_bit(pos)
+
+        row_offset = len(self.positions)
+        for row, pair in other.other_alleles.items():
+            self.other_alleles[row + row_offset] = pair
+        self.positions.extend(other.positions)
+        self.alleles.extend(other.alleles)
+        self.snpids.extend(other.snpids)
+        self.transitions = self.transitions + other.transitions
+        self.is_sorted = self.is_sorted and other.is_sorted and other_min_pos > self.max_pos
+        self.max_pos = max(self.max_pos, other.max_pos)
+
+    def finalize(self) -> None:
+        '''Sorts the columns by position (a no-op if SNPs were added in order)'''
+        if self.is_sorted:
+            return
+        order = sorted(range(0, len(self.positions)), key = self.positions.__getitem__)
+        self.positions = array("q", [self.positions[row] for row in order])
+        self.alleles = bytearray([self.alleles[row] for row in order])
+        self.snpids = [self.snpids[row] for row in order]
+        new_rows = dict()
+        for new_row in range(0, len(order)):
+            new_rows[order[new_row]] = new_row
+        self.other_alleles = {new_rows[row]: pair for row, pair in self.other_alleles.items()}
+        self.is_sorted = True
+
+    def get_snp(self, row: int) -> SNP:
+        '''Returns a SNP object for the given row of the columns'''
+        if row in self.other_alleles:
+            refallele, altallele = self.other_alleles[row]
+        else:
+            allele_byte = self.alleles[row]
+            refallele = ALLELE_BASES[allele_byte >> 3]
+            altallele = ALLELE_BASES[allele_byte & 7]
+        return SNP(self.chrname, self.positions[row], self.snpids[row], refallele, altallele)
+
+    def snps(self):
+        '''Generator yielding a SNP object for every row, in row order (one
+        per ALT allele at multi-allelic sites). SNPs are built on demand from
+        the columns; use add_snp() to store new ones.'''
+        for row in range(0, len(self.positions)):
+            yield self.get_snp(row)
 
     def count_transitions(self) -> int:
         """ Returns the number of transition snps stored in this chromosome """
-        count = 0
-        for location in self.locations_to_snps:
-            snp = self.locations_to_snps[location]
-            if snp.is_transition():
-                count = count + 1
-        return count
+        return self.transitions
 
     def count_transversions(self) -> int:
         '''Returns the number of transversion SNPs stored in this chromosome'''
-        total_snps = len(self.locations_to_snps)
+        total_snps = len(self.positions)
         return total_snps - self.count_transitions()
 
-def vcf_to_chrnames_dict(filename: str) -> dict[str,Chromosome]:
+    def density_region(self, l: int, m: int) -> float:
+        '''returns the number of snps between l and m, divided by the size of the region
+        (times 1000). Uses two binary searches over the sorted positions.'''
+        self.finalize()
+        count = bisect.bisect_right(self.positions, m) - bisect.bisect_left(self.positions, l)
+        size = m - l  + 1
+        return 1000*count/size
+
+    def get_last_snp_position(self) -> int:
+        '''returns the position of the last SNP known'''
+        self.finalize()
+        return self.positions[len(self.positions) - 1]
+
+    def window_densities(self, region_size: int, step_size: int = None):
+        '''Generator yielding [density, start, end] for windows of region_size
+        starting at 1 and every step_size after (default: region_size, i.e.
+        non-overlapping), up to the last SNP. Two pointers sweep the sorted
+        positions once, so all windows take O(SNPs + windows) time.'''
+        if step_size is None:
+            step_size = region_size
+        assert region_size > 0 and step_size > 0, "Error: window and step sizes must be positive"
+        self.finalize()
+        positions = self.positions
+        num_snps = len(positions)
+        last_snp_position = self.get_last_snp_position()
+
+        first_in = 0        # index of the first SNP with pos >= region_start
+        first_after = 0     # index of the first SNP with pos > region_end
+        region_start = 1
+        while region_start < last_snp_position:
+            region_end = region_start + region_size - 1
+            while first_in < num_snps and positions[first_in] < region_start:
+                first_in = first_in + 1
+            while first_after < num_snps and positions[first_after] <= region_end:
+                first_after = first_after + 1
+            count = first_after - first_in
+            yield [1000*count/region_size, region_start, region_end]
+            region_start = region_start + step_size
+
+    def max_density(self, region_size: int, step_size: int = None) -> list:
+        '''Given a region size, looks at windows of that size (every step_size
+        bases; by default non-overlapping) and returns a list of three elements 
+        for the region with the highest density:
+        [density of region, start of region, end of region]'''
+        ## default answer if no SNPs exist [density, start, end]:
+        best_answer = [0.0, 1, region_size - 1]
+        for region_answer in self.window_densities(region_size, step_size):
+            # if this region has a higher density than any we've seen so far:
+            if region_answer[0] > best_answer[0]:
+                best_answer = region_answer
+        return best_answer
+
+    def density_profile(self, region_sizes: list[int]):
+        '''Generator yielding [region_size, density, start, end] for the 
+        non-overlapping windows of every size in region_sizes (the same 
+        windows as window_densities(size) yields for each size), all from one
+        sweep over the sorted positions. A window is yielded as soon as the 
+        sweep passes its end, so sizes come out interleaved; within one size,
+        windows come out in order.'''
+        for region_size in region_sizes:
+            assert region_size > 0, "Error: window sizes must be positive"
+        self.finalize()
+        positions = self.positions
+        if len(positions) == 0:
+            return
+        last_snp_position = positions[len(positions) - 1]
+
+        sizes = list(region_sizes)
+        num_sizes = len(sizes)
+        current_windows = [0] * num_sizes       # 0-based index of each size's open window
+        counts = [0] * num_sizes
+        for pos in positions:
+            if pos < 1:
+                continue
+            for i in range(0, num_sizes):
+                region_size = sizes[i]
+                window = (pos - 1) // region_size
+                if window != current_windows[i]:
+                    ## close the open window and any empty ones up to this SNP
+                    count = counts[i]
+                    for closed_window in range(current_windows[i], window):
+                        region_start = closed_window * region_size + 1
+                        yield [region_size, 1000*count/region_size, region_start, region_start + region_size - 1]
+                        count = 0
+                    current_windows[i] = window
+                    counts[i] = 1
+                else:
+                    counts[i] = counts[i] + 1
+
+        ## the last open windows (window_densities() stops before last_snp_position)
+        for i in range(0, num_sizes):
+            region_size = sizes[i]
+            region_start = current_windows[i] * region_size + 1
+            if region_start < last_snp_position:
+                yield [region_size, 1000*counts[i]/region_size, region_start, region_start + region_size - 1]
+
+    def max_densities(self, region_sizes: list[int], window_callback = None) -> dict[int,list]:
+        '''Given a list of region sizes, returns a dictionary mapping each size
+        to the [density of region, start of region, end of region] list that
+        max_density(size) would return, computed in one density_profile() 
+        sweep. If given, window_callback(region_size, density, start, end) is
+        called for every window of the sweep (e.g. to write them out).'''
+        sizes_to_best = {region_size: [0.0, 1, region_size - 1] for region_size in region_sizes}
+        for region_size, density, region_start, region_end in self.density_profile(region_sizes):
+            if window_callback is not None:
+                window_callback(region_size, density, region_start, region_end)
+            if density > sizes_to_best[region_size][0]:
+                sizes_to_best[region_size] = [density, region_start, region_end]
+        return sizes_to_best
+
+class ChromosomeCounts:
+    """ Running transition/transversion counts for one chromosome, kept by
+    vcf_to_transition_counts() instead of the SNPs themselves """
+    __slots__ = ("chrname", "transitions", "transversions", "max_pos", "is_sorted")
+
+    def __init__(self, chrname: str) -> None:
+        """ Constructor """
+        self.chrname = sys.intern(chrname)
+        self.transitions = 0
+        self.transversions = 0
+        self.max_pos = -1
+        self.is_sorted = True
+
+    def get_name(self) -> str:
+        """ Returns the chromosome name"""
+        return self.chrname
+
+    def count_transitions(self) -> int:
+        """ Returns the number of transition snps seen on this chromosome """
+        return self.transitions
+
+    def count_transversions(self) -> int:
+        '''Returns the number of transversion SNPs seen on this chromosome'''
+        return self.transversions
+
+def is_gzipped(filename: str) -> bool:
+    '''Returns True if the file starts with the gzip (and bgzip) magic bytes'''
+    with open(filename, "rb") as fhandle:
+        return fhandle.read(2) == b"\x1f\x8b"
+
+def open_vcf(filename: str):
+    '''Opens a VCF file for reading as text with a large (1 MB) buffer,
+    transparently decompressing gzip or bgzip input.'''
+    if is_gzipped(filename):
+        return io.TextIOWrapper(io.BufferedReader(gzip.GzipFile(filename, "rb"), VCF_BUFFER_SIZE))
+    return open(filename, "r", buffering = VCF_BUFFER_SIZE)
+
+def parse_vcf_line(line: str) -> tuple:
+    '''Given a VCF data line, returns (chrname, pos, snpid, refallele,
+    altalleles), where altalleles is the list of comma-separated ALT alleles.
+    Only the first five tab-delimited fields are split out; the rest of the
+    line (QUAL, INFO, sample genotypes, ...) is left unsplit.'''
+    line_list = line.split("\t", 5)
+    altalleles = line_list[4]
+    if len(line_list) == 5:
+        altalleles = altalleles.rstrip("\r\n")
+    return (line_list[0], int(line_list[1]), line_list[2], line_list[3], altalleles.split(","))
+
+def vcf_records(filename: str):
+    '''Generator yielding parse_vcf_line() tuples for each data line of a
+    (possibly gzipped) VCF file, skipping header lines.'''
+    with open_vcf(filename) as fhandle:
+        for line in fhandle:
+            # don't attempt to parse header (or blank) lines
+            if line[0] not in "#\r\n":
+                yield parse_vcf_line(line)
+
+def vcf_records_to_chrnames_dict(records) -> dict[str,Chromosome]:
+    '''Given an iterable of parse_vcf_line() tuples, returns a (not yet
+    finalized) chrnames_to_chrs dictionary.'''
+    chrnames_to_chrs = dict()
+    for chrname, pos, snpid, refallele, altalleles in records:
+        ## Put the data in the dictionary
+        if chrname in chrnames_to_chrs:
+            chr_obj = chrnames_to_chrs[chrname]
+        else:
+            chr_obj = Chromosome(chrname)
+            chrnames_to_chrs[chrname] = chr_obj
+        chr_obj.add_snp(chrname, pos, snpid, refallele, altalleles)
+    return chrnames_to_chrs
+
+def vcf_range_records(filename: str, start: int, end: int):
+    '''Generator yielding parse_vcf_line() tuples for the data lines of an
+    uncompressed VCF file that start at byte offsets start <= offset < end
+    (start must be the start of a line).'''
+    with open(filename, "rb", buffering = VCF_BUFFER_SIZE) as fhandle:
+        fhandle.seek(start)
+        offset = start
+        for line in fhandle:
+            if offset >= end:
+                break
+            offset = offset + len(line)
+            # don't attempt to parse header (or blank) lines
+            if line[0] not in b"#\r\n":
+                yield parse_vcf_line(line.decode())
+
+def vcf_range_to_chrnames_dict(filename: str, start: int, end: int) -> dict[str,Chromosome]:
+    '''Worker task for vcf_to_chrnames_dict(): parses one byte range'''
+    return vcf_records_to_chrnames_dict(vcf_range_records(filename, start, end))
+
+def cache_key(filename: str) -> dict:
+    '''Returns the path, size and modification time that a cache of the
+    parsed VCF file must match to be reused.'''
+    stat = os.stat(filename)
+    return {"path": os.path.abspath(filename), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+def save_chrnames_cache(chrnames_to_chrs: dict[str,Chromosome], cache_filename: str, key: dict) -> None:
+    '''Writes finalized Chromosomes to a compact binary cache file: a magic
+    line, a length-prefixed JSON header (key, names, row counts, non-ACGT
+    alleles), then for each chromosome its raw little-endian positions, its
+    packed allele bytes and its newline-joined SNP ids.'''
+    header = {"key": key, "chromosomes": list()}
+    blobs = list()
+    for chrname, chr_obj in chrnames_to_chrs.items():
+        chr_obj.finalize()
+        positions = array("q", chr_obj.positions)
+        if sys.byteorder == "big":
+            positions.byteswap()
+        snpids_blob = "\n".join(chr_obj.snpids).encode()
+        header["chromosomes"].append({"name": chrname,
+                                      "num_rows": len(chr_obj.positions),
+                                      "snpids_bytes": len(snpids_blob),
+                                      "other_alleles": [[row, ref, alt] for row, (ref, alt) in chr_obj.other_alleles.items()]})
+        blobs.extend([positions.tobytes(), bytes(chr_obj.alleles), snpids_blob])
+
+    header_bytes = json.dumps(header).encode()
+    ## write to a temporary file first, so readers never see a partial cache
+    tmp_filename = cache_filename + ".tmp"
+    with open(tmp_filename, "wb") as fhandle:
+        fhandle.write(CACHE_MAGIC)
+        fhandle.write(len(header_bytes).to_bytes(8, "little"))
+        fhandle.write(header_bytes)
+        for blob in blobs:
+            fhandle.write(blob)
+    os.replace(tmp_filename, cache_filename)
+
+def load_chrnames_cache(cache_filename: str, key: dict) -> dict[str,Chromosome]:
+    '''Reads a cache written by save_chrnames_cache(); returns None if the
+    file is missing, is not a cache, or was made for a different key.'''
+    if not os.path.exists(cache_filename):
+        return None
+    with open(cache_filename, "rb") as fhandle:
+        if fhandle.read(len(CACHE_MAGIC)) != CACHE_MAGIC:
+            return None
+        header_len = int.from_bytes(fhandle.read(8), "little")
+        header = json.loads(fhandle.read(header_len))
+        if header["key"] != key:
+            return None
+
+        chrnames_to_chrs = dict()
+        for chr_info in header["chromosomes"]:
+            num_rows = chr_info["num_rows"]
+            chr_obj = Chromosome(chr_info["name"])
+            chr_obj.positions.frombytes(fhandle.read(8 * num_rows))
+            if sys.byteorder == "big":
+                chr_obj.positions.byteswap()
+            chr_obj.alleles = bytearray(fhandle.read(num_rows))
+            ## translate() maps each packed ref/alt byte to 1 (transition) or 0 in C
+            chr_obj.transitions = chr_obj.alleles.translate(_TRANSITION_TABLE).count(1)
+            snpids_blob = fhandle.read(chr_info["snpids_bytes"]).decode()
+            if num_rows > 0:
+                chr_obj.snpids = [sys.intern(snpid) for snpid in snpids_blob.split("\n")]
+            for row, ref, alt in chr_info["other_alleles"]:
+                chr_obj.other_alleles[row] = (sys.intern(ref), sys.intern(alt))
+            if num_rows > 0:
+                chr_obj.max_pos = chr_obj.positions[num_rows - 1]
+            chrnames_to_chrs[chr_obj.chrname] = chr_obj
+    return chrnames_to_chrs
+
+def vcf_to_chrnames_dict(filename: str, workers: int = 1, cache: bool = False) -> dict[str,Chromosome]:
     '''Create chrnames_to_chrs dictionary, given an input VCF file name
-    returns the dictionary.'''
+    returns the dictionary. Multi-allelic sites add one SNP per ALT allele.
+    With workers > 1, an uncompressed file is split into line-aligned byte
+    ranges that are parsed in parallel worker processes; the per-range
+    Chromosomes are then merged in file order, still rejecting duplicate
+    positions. Compressed input is always parsed by a single process.
+    With cache=True, the parsed data is saved to filename + ".snpcache" and
+    reloaded from there on later calls, as long as the VCF's path, size and
+    modification time are unchanged; otherwise the cache is rebuilt.'''
+    if cache:
+        key = cache_key(filename)
+        cache_filename = filename + CACHE_SUFFIX
+        chrnames_to_chrs = load_chrnames_cache(cache_filename, key)
+        if chrnames_to_chrs is None:
+            chrnames_to_chrs = vcf_to_chrnames_dict(filename, workers)
+            save_chrnames_cache(chrnames_to_chrs, cache_filename, key)
+        return chrnames_to_chrs
+
+    ranges = list()
+    if workers > 1 and not is_gzipped(filename):
+        ranges = MyTableModule.line_aligned_ranges(filename, workers)
+    ## an empty or one-line file gives fewer than two ranges: no pool needed
+    if len(ranges) > 1:
+        with multiprocessing.Pool(min(workers, len(ranges))) as pool:
+            range_dicts = pool.starmap(vcf_range_to_chrnames_dict, [(filename, start, end) for start, end in ranges])
+    else:
+        range_dicts = [vcf_records_to_chrnames_dict(vcf_records(filename))]
+
     chrnames_to_chrs = dict()
-    with open(filename, "r") as fhandle:
+    for range_dict in range_dicts:
+        for chrname, chr_obj in range_dict.items():
+            if chrname in chrnames_to_chrs:
+                chrnames_to_chrs[chrname].merge(chr_obj)
+            else:
+                chrnames_to_chrs[chrname] = chr_obj
+
+    for chr_obj in chrnames_to_chrs.values():
+        chr_obj.finalize()
+    return chrnames_to_chrs
+
+def vcf_to_transition_counts(filename: str) -> dict[str,ChromosomeCounts]:
+    '''Given a (possibly gzipped) VCF file name, returns a chrname ->
+    ChromosomeCounts dictionary with the same transition and transversion
+    counts as vcf_to_chrnames_dict(), but without storing any SNPs: each 
+    line only updates its chromosome's counters. Duplicate positions are 
+    caught by comparing against the largest position so far, which is enough
+    while a chromosome's records are sorted; chromosomes that turn out to be
+    unsorted are checked in a second pass with a one-bit-per-base bitmap.'''
+    chrnames_to_counts = dict()
+    counts = None
+    with open_vcf(filename) as fhandle:
         for line in fhandle:
-            # don't attempt to parse header lines
-            if line[0] != "#":
-                line_stripped = line.strip()
-                line_list = re.split(r"\s+", line_stripped)
+            # don't attempt to parse header (or blank) lines
+            if line[0] in "#\r\n":
+                continue
+            line_list = line.split("\t", 5)
+            chrname = line_list[0]
+            if counts is None or chrname != counts.chrname:
+                if chrname not in chrnames_to_counts:
+                    chrnames_to_counts[chrname] = ChromosomeCounts(chrname)
+                counts = chrnames_to_counts[chrname]
 
-                chrname = line_list[0]
-                pos = int(line_list[1])
-                snpid = line_list[2]
-                refallele = line_list[3]
-                altallele = line_list[4]
-
-                ## Put the data in the dictionary
-                if chrname in chrnames_to_chrs:
-                    chr_obj = chrnames_to_chrs[chrname]
-                    chr_obj.add_snp(chrname, pos, snpid, refallele, altallele)
+            pos = int(line_list[1])
+            if pos > counts.max_pos:
+                counts.max_pos = pos
+            else:
+                assert pos != counts.max_pos, f"Duplicate SNP: {chrname}:{pos}"
+                counts.is_sorted = False
+
+            refallele = line_list[3]
+            altalleles = line_list[4]
+            if len(line_list) == 5:
+                altalleles = altalleles.rstrip("\r\n")
+            for altallele in altalleles.split(","):
+                is_transition = _TRANSITION_PAIRS.get(refallele + altallele)
+                if is_transition is None:
+                    assert refallele != altallele, "Error: ref == alt at pos " + str(pos)
+                    counts.transversions = counts.transversions + 1
+                elif is_transition:
+                    counts.transitions = counts.transitions + 1
                 else:
-                    chr_obj = Chromosome(chrname)
-                    chr_obj.add_snp(chrname, pos, snpid, refallele, altallele)
-                    chrnames_to_chrs[chrname] = chr_obj
-    return chrnames_to_chrs
+                    counts.transversions = counts.transversions + 1
+
+    unsorted_chrnames = [chrname for chrname, counts in chrnames_to_counts.items() if not counts.is_sorted]
+    if len(unsorted_chrnames) > 0:
+        check_duplicate_positions(filename, unsorted_chrnames)
+    return chrnames_to_counts
+
+def check_duplicate_positions(filename: str, chrnames: list[str]) -> None:
+    '''Re-reads a VCF file and asserts that no position repeats on any of the
+    given chromosomes, using one bit per base up to each one's last SNP.'''
+    chrnames_to_bitmaps = {chrname: bytearray() for chrname in chrnames}
+    for chrname, pos, snpid, refallele, altalleles in vcf_records(filename):
+        if chrname in chrnames_to_bitmaps:
+            bitmap = chrnames_to_bitmaps[chrname]
+            byte_index = pos >> 3
+            if byte_index >= len(bitmap):
+                bitmap.extend(bytes(max(byte_index + 1, 2 * len(bitmap)) - len(bitmap)))
+            bit = 1 << (pos & 7)
+            assert not bitmap[byte_index] & bit, f"Duplicate SNP: {chrname}:{pos}"
+            bitmap[byte_index] = bitmap[byte_index] | bit
+
+def build_vcf_index(filename: str, block_size: int = VCF_INDEX_BLOCK_SIZE) -> str:
+    '''Given an uncompressed VCF file sorted by position within contiguous 
+    chromosomes, writes a tabix-like linear index to filename + ".vidx" and
+    returns its name. For each chromosome the index lists, for every 
+    block_size-base block, the byte offset of the first record at or after 
+    the block start, plus the offset just past the chromosome's last record.'''
+    assert not is_gzipped(filename), "Only uncompressed VCF files can be indexed"
+    chrnames_to_blocks = dict()
+    current_chrname = None
+    with open(filename, "rb", buffering = VCF_BUFFER_SIZE) as fhandle:
+        offset = 0
+        for line in fhandle:
+            if line[0] not in b"#\r\n":
+                line_list = line.split(b"\t", 2)
+                chrname = line_list[0].decode()
+                pos = int(line_list[1])
+                if chrname != current_chrname:
+                    assert chrname not in chrnames_to_blocks, f"VCF is not sorted: {chrname} appears twice"
+                    blocks = {"offsets": list(), "end": 0}
+                    chrnames_to_blocks[chrname] = blocks
+                    current_chrname = chrname
+                    last_pos = 0
+                assert pos >= last_pos, f"VCF is not sorted: {chrname}:{pos} after {last_pos}"
+                last_pos = pos
+
+                ## empty blocks point at the next record, like the tabix linear index
+                block = (pos - 1) // block_size
+                while len(blocks["offsets"]) <= block:
+                    blocks["offsets"].append(offset)
+                blocks["end"] = offset + len(line)
+            offset = offset + len(line)
+
+    index_filename = filename + VCF_INDEX_SUFFIX
+    with open(index_filename, "w") as index_handle:
+        json.dump({"key": cache_key(filename), "block_size": block_size, "chromosomes": chrnames_to_blocks}, index_handle)
+    return index_filename
+
+class IndexedVCF:
+    """ Region queries on a sorted, uncompressed VCF file through a .vidx index """
+    def __init__(self, filename: str) -> None:
+        '''Constructor; builds filename + ".vidx" if it is missing or was made
+        for a different version of the file, then loads it.'''
+        self.filename = filename
+        index_filename = filename + VCF_INDEX_SUFFIX
+        index = None
+        if os.path.exists(index_filename):
+            with open(index_filename, "r") as index_handle:
+                index = json.load(index_handle)
+        if index is None or index["key"] != cache_key(filename):
+            build_vcf_index(filename)
+            with open(index_filename, "r") as index_handle:
+                index = json.load(index_handle)
+        self.block_size = index["block_size"]
+        self.chrnames_to_blocks = index["chromosomes"]
+
+    def __contains__(self, chrname: str) -> bool:
+        return chrname in self.chrnames_to_blocks
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        pass
+
+    def fetch(self, chrname: str, start: int, end: int):
+        '''Generator yielding parse_vcf_line() tuples for the records on 
+        chrname with start <= pos <= end (1-based, inclusive, as in VCF). 
+        Seeks straight to the block holding start and stops at the first 
+        record past end, so memory use does not depend on the file size.'''
+        if chrname not in self.chrnames_to_blocks:
+            return
+        blocks = self.chrnames_to_blocks[chrname]
+        block = max(start - 1, 0) // self.block_size
+        if block >= len(blocks["offsets"]):
+            return
+
+        with open(self.filename, "rb") as fhandle:
+            offset = blocks["offsets"][block]
+            fhandle.seek(offset)
+            for line in fhandle:
+                if offset >= blocks["end"]:
+                    break
+                offset = offset + len(line)
+                record = parse_vcf_line(line.decode())
+                if record[1] > end:
+                    break
+                if record[1] >= start:
+                    yield record
+
+def parse_region(region: str) -> tuple[str,int,int]:
+    '''Given a region string like "chr1:1000-2000" (or just "chr1"), returns
+    (chrname, start, end) with 1-based inclusive coordinates.'''
+    if ":" not in region:
+        return (region, 1, sys.maxsize)
+    chrname, coords = region.rsplit(":", 1)
+    start, end = coords.replace(",", "").split("-")
+    return (chrname, int(start), int(end))
 
 if __name__ == "__main__":      #only run tests when script is executed, not imported
     print(f"{__file__.split('/')[-1]} was executed.\n\tRunning tests...\n")
@@ -117,6 +699,12 @@ if __name__ == "__main__":      #only run tests when script is executed, not imp
         # print(f"Exception:\t{type(e).__name__}")
         # print(f"Description:\t{e}")
         pass        ## catches error in try statement, continues execution
+    assert SNP("1", 5, ".", "AG", "A").is_transversion(), "Failed Test"
+    try:
+        snp1.qual = 30      ## no per-instance __dict__
+        raise Exception("WARNING! SNP accepts new attributes")
+    except AttributeError:
+        pass
     print("Passed SNP tests!")
 
     ## A test chromosome
@@ -137,4 +725,122 @@ if __name__ == "__main__":      #only run tests when script is executed, not imp
         # print(f"Description:\t{e}")
         pass        ## catches error in try statement, continues execution
 
-    print("Passed chromosome tests!")
\ No newline at end of file
+    print("Passed chromosome tests!")
+
+    ## Out-of-order SNPs are sorted on finalize, and still checked for duplicates
+    chr2 = Chromosome("testChr")
+    chr2.add_snp("testChr", 500, "rs1", "A", "G")
+    chr2.add_snp("testChr", 100, "rs2", "AT", "A")
+    try:
+        chr2.add_snp("testChr", 500, "rs3", "C", "T")
+        raise Exception("WARNING! Fails to fail duplicate SNP")
+    except AssertionError:
+        pass
+    chr2.finalize()
+    assert list(chr2.positions) == [100, 500], "Failed Test"
+    assert chr2.get_snp(0).refallele == "AT" and chr2.get_snp(1).snpid == "rs1", "Failed Test"
+    assert chr2.count_transitions() == 1 and chr2.count_transversions() == 1, "Failed Test"
+    print("Passed columnar chromosome tests!")
+
+    ## Density: non-overlapping windows of 4 split the SNPs at 4 and 5, but
+    ## sliding the window by 2 finds both in 3..6
+    chr3 = Chromosome("testChr")
+    for pos in [20, 4, 5]:
+        chr3.add_snp("testChr", pos, ".", "A", "C")
+    assert chr3.density_region(1, 10) == 200.0, "Failed Test"
+    assert chr3.get_last_snp_position() == 20, "Failed Test"
+    assert chr3.max_density(4) == [250.0, 1, 4], "Failed Test"
+    assert chr3.max_density(4, 2) == [500.0, 3, 6], "Failed Test"
+    assert chr3.max_densities([4, 10]) == {4: [250.0, 1, 4], 10: [200.0, 1, 10]}, "Failed Test"
+    windows = list()
+    chr3.max_densities([4, 10], lambda *window: windows.append(list(window)))
+    assert sorted(windows) == sorted(chr3.density_profile([4, 10])), "Failed Test"
+    profile = [window for window in chr3.density_profile([4]) if window[0] == 4]
+    assert profile == [[4] + window for window in chr3.window_densities(4)], "Failed Test"
+    print("Passed density tests!")
+
+    ## Tokenizer: only five fields are split, ALT lists are expanded
+    assert parse_vcf_line("1\t100\trs5\tA\tG,T\t50\tPASS\t.\tGT\t0|1\n") == ("1", 100, "rs5", "A", ["G", "T"]), "Failed Test"
+    assert parse_vcf_line("1\t100\trs5\tA\tG\n") == ("1", 100, "rs5", "A", ["G"]), "Failed Test"
+    chr4 = Chromosome("testChr")
+    chr4.add_snp("testChr", 100, "rs5", "A", ["G", "T"])
+    assert len(chr4) == 2 and chr4.count_transitions() == 1 and chr4.is_sorted, "Failed Test"
+    assert [(snp.pos, snp.altallele) for snp in chr4.snps()] == [(100, "G"), (100, "T")], "Failed Test"
+    print("Passed VCF tokenizer tests!")
+
+    ## merge() keeps the duplicate check across parts of a file
+    chr5 = Chromosome("testChr")
+    chr5.add_snp("testChr", 10, ".", "A", "G")
+    chr6 = Chromosome("testChr")
+    chr6.add_snp("testChr", 5, ".", "C", "T")
+    chr5.merge(chr6)
+    chr5.finalize()
+    assert list(chr5.positions) == [5, 10] and chr5.count_transitions() == 2, "Failed Test"
+    try:
+        chr5.merge(chr6)
+        raise Exception("WARNING! Fails to fail duplicate SNP")
+    except AssertionError:
+        pass
+    print("Passed chromosome merge tests!")
+
+    ## Cache round trip, and invalidation when the VCF changes
+    import tempfile
+    fd, test_vcf = tempfile.mkstemp(suffix = ".vcf")
+    with os.fdopen(fd, "w") as fhandle:
+        fhandle.write("#CHROM\tPOS\tID\tREF\tALT\n1\t10\trs1\tA\tG\n1\t20\t.\tAT\tA\n")
+    chrs_parsed = vcf_to_chrnames_dict(test_vcf, cache = True)
+    chrs_cached = vcf_to_chrnames_dict(test_vcf, cache = True)
+    assert list(chrs_cached["1"].positions) == [10, 20] and chrs_cached["1"].snpids == ["rs1", "."], "Failed Test"
+    assert chrs_cached["1"].get_snp(1).refallele == "AT", "Failed Test"
+    with open(test_vcf, "a") as fhandle:
+        fhandle.write("2\t5\t.\tC\tT\n")
+    assert "2" in vcf_to_chrnames_dict(test_vcf, cache = True), "Failed Test"
+    os.remove(test_vcf + CACHE_SUFFIX)
+    os.remove(test_vcf)
+    print("Passed VCF cache tests!")
+
+    ## Parallel parsing matches a single process, also for an empty file
+    fd, test_vcf = tempfile.mkstemp(suffix = ".vcf")
+    os.close(fd)
+    assert vcf_to_chrnames_dict(test_vcf, workers = 4) == {} == vcf_to_chrnames_dict(test_vcf), "Failed Test"
+    with open(test_vcf, "w") as fhandle:
+        for pos in range(1, 301):
+            fhandle.write(f"{pos % 3}\t{pos}\t.\tA\t{'GCT'[pos % 3]}\n")
+    chrs_serial = vcf_to_chrnames_dict(test_vcf)
+    chrs_parallel = vcf_to_chrnames_dict(test_vcf, workers = 3)
+    for chrname in chrs_serial:
+        assert list(chrs_parallel[chrname].positions) == list(chrs_serial[chrname].positions), "Failed Test"
+    os.remove(test_vcf)
+    print("Passed parallel parsing tests!")
+
+    ## Streaming counts match the columnar ones; unsorted duplicates are still caught
+    fd, test_vcf = tempfile.mkstemp(suffix = ".vcf")
+    with os.fdopen(fd, "w") as fhandle:
+        fhandle.write("#CHROM\tPOS\tID\tREF\tALT\n1\t10\t.\tA\tG,T\n1\t5\t.\tAT\tA\n2\t7\t.\tC\tT\n")
+    chrs_counted = vcf_to_transition_counts(test_vcf)
+    assert [(c.get_name(), c.count_transitions(), c.count_transversions()) for c in chrs_counted.values()] == [("1", 1, 2), ("2", 1, 0)], "Failed Test"
+    with open(test_vcf, "a") as fhandle:
+        fhandle.write("1\t5\t.\tC\tT\n")
+    try:
+        vcf_to_transition_counts(test_vcf)
+        raise Exception("WARNING! Fails to fail duplicate SNP")
+    except AssertionError:
+        pass
+    os.remove(test_vcf)
+    print("Passed streaming count tests!")
+
+    ## Region index: blocks of 10 bases, the empty block 2 points at pos 35
+    fd, test_vcf = tempfile.mkstemp(suffix = ".vcf")
+    with os.fdopen(fd, "w") as fhandle:
+        fhandle.write("#CHROM\tPOS\tID\tREF\tALT\n")
+        for chrname, pos in [("1", 5), ("1", 12), ("1", 35), ("2", 3), ("2", 40)]:
+            fhandle.write(f"{chrname}\t{pos}\t.\tA\tG\n")
+    build_vcf_index(test_vcf, block_size = 10)
+    with IndexedVCF(test_vcf) as indexed:
+        assert [record[1] for record in indexed.fetch("1", 10, 40)] == [12, 35], "Failed Test"
+        assert [record[1] for record in indexed.fetch("1", 21, 30)] == [], "Failed Test"
+        assert [record[1] for record in indexed.fetch(*parse_region("2:1-100"))] == [3, 40], "Failed Test"
+        assert list(indexed.fetch("3", 1, 100)) == [], "Failed Test"
+    os.remove(test_vcf + VCF_INDEX_SUFFIX)
+    os.remove(test_vcf)
+    print("Passed VCF region index tests!")
@@ -1,16 +1,85 @@
 #!/usr/bin/env python
 
 class BinaryTree:
+    """ A self-balancing (AVL) binary search tree; equal items are kept, to
+    the right of each other. Inserts and lookups walk the tree in a loop
+    rather than recursing, so sorted input (e.g. genomic positions) keeps
+    the tree about log2(n) deep instead of degrading to a linked list. """
     def __init__(self):
         self.root_n = None
+        self.size = 0
+
+    @classmethod
+    def from_sorted(cls, items):
+        '''Builds a balanced tree from already-sorted items in O(n)'''
+        items = list(items)
+        for index in range(1, len(items)):
+            assert not items[index] < items[index - 1], "Error: from_sorted() needs sorted items"
+        tree = cls()
+        tree.root_n = _build_balanced(items, 0, len(items))
+        tree.size = len(items)
+        return tree
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, query):
+        return self.is_item_present(query)
+
+    def __iter__(self):
+        '''Yields the items in sorted order'''
+        return self.range(None, None)
 
     def insert_item(self, item):
         if self.root_n == None:
             newnode = Node(item)
             self.root_n = newnode
+            self.size = 1
+            return
+
+        ## walk down to the free spot, remembering the path
+        path = list()
+        node = self.root_n
+        while node != None:
+            path.append(node)
+            if item < node.item:
+                node = node.left_n
+            else:
+                node = node.right_n
+        newnode = Node(item)
+        parent = path[-1]
+        if item < parent.item:
+            parent.left_n = newnode
         else:
-            self.root_n.insert_item(item)
-    
+            parent.right_n = newnode
+        self.size = self.size + 1
+
+        ## walk back up, fixing heights and rotating where unbalanced
+        for index in range(len(path) - 1, -1, -1):
+            node = path[index]
+            old_height = node.height
+            subtree = _rebalance(node)
+            if subtree is not node:
+                if index == 0:
+                    self.root_n = subtree
+                elif path[index - 1].left_n is node:
+                    path[index - 1].left_n = subtree
+                else:
+                    path[index - 1].right_n = subtree
+            if subtree.height == old_height:
+                break       # nothing above changes height either
+
+    def is_item_present(self, query) -> bool:
+        node = self.root_n
+        while node != None:
+            if query < node.item:
+                node = node.left_n
+            elif node.item < query:
+                node = node.right_n
+            else:
+                return True
+        return False
+
     def get_smallest(self):
         if self.root_n == None:
             return None
@@ -18,56 +87,160 @@ class BinaryTree:
             answer = self.root_n.get_smallest()
             return answer
 
+    def get_largest(self):
+        if self.root_n == None:
+            return None
+        else:
+            answer = self.root_n.get_largest()
+            return answer
+
+    def range(self, lo, hi):
+        '''Yields, in sorted order, the items with lo <= item < hi (None for
+        no bound), skipping subtrees that lie outside the bounds'''
+        stack = list()
+        node = self.root_n
+        while stack or node != None:
+            if node != None:
+                if lo is not None and node.item < lo:
+                    node = node.right_n             # whole left side is below lo
+                else:
+                    stack.append(node)
+                    node = node.left_n
+            else:
+                node = stack.pop()
+                if hi is not None and not node.item < hi:
+                    return
+                yield node.item
+                node = node.right_n
+
+    def get_height(self) -> int:
+        return _height(self.root_n)
+
 class Node:
+    __slots__ = ("item", "left_n", "right_n", "height")
+
     def __init__(self, item):
         self.item = item
         self.left_n = None
         self.right_n = None
-        
+        self.height = 1
+
     def get_item(self):
         return self.item
-    
+
     def get_left_n(self):
         return self.left_n
-    
+
     def set_left_n(self, newleft):
         self.left_n = newleft
-        
+
     def get_right_n(self):
         return self.right_n
-    
+
     def set_right_n(self, newright):
         self.right_n = newright
 
-    def insert_item(self, item):
-        if item < self.item:                        
-            if self.left_n == None:                 # 1a.  
-                newnode = Node(item)
-                self.left_n = newnode
-            else:                                   # 1b.
-                self.left_n.insert_item(item)
-        else:
-            if self.right_n == None:                # 2a.
-                newnode = Node(item)
-                self.right_n = newnode
-            else:                                   # 2b.
-                self.right_n.insert_item(item)
-                
-
     def get_smallest(self):
-        if self.left_n == None:
-            return self.item
-        else:
-            answer = self.left_n.get_smallest()
-            return answer
+        node = self
+        while node.left_n != None:
+            node = node.left_n
+        return node.item
+
+    def get_largest(self):
+        node = self
+        while node.right_n != None:
+            node = node.right_n
+        return node.item
+
+def _height(node) -> int:
+    if node == None:
+        return 0
+    return node.height
+
+def _update_height(node):
+    node.height = 1 + max(_height(node.left_n), _height(node.right_n))
+
+def _rotate_left(node):
+    '''Rotates node's right child up; returns the new subtree root'''
+    top = node.right_n
+    node.right_n = top.left_n
+    top.left_n = node
+    _update_height(node)
+    _update_height(top)
+    return top
+
+def _rotate_right(node):
+    '''Rotates node's left child up; returns the new subtree root'''
+    top = node.left_n
+    node.left_n = top.right_n
+    top.right_n = node
+    _update_height(node)
+    _update_height(top)
+    return top
+
+def _rebalance(node):
+    '''Updates node's height and, if its children's heights differ by 2,
+    rotates it back into balance; returns the (new) subtree root'''
+    _update_height(node)
+    balance = _height(node.left_n) - _height(node.right_n)
+    if balance > 1:
+        if _height(node.left_n.left_n) < _height(node.left_n.right_n):
+            node.left_n = _rotate_left(node.left_n)
+        return _rotate_right(node)
+    if balance < -1:
+        if _height(node.right_n.right_n) < _height(node.right_n.left_n):
+            node.right_n = _rotate_right(node.right_n)
+        return _rotate_left(node)
+    return node
+
+def _build_balanced(items, start, end):
+    '''Builds a balanced subtree of items[start:end] around its middle item
+    (recursion depth is only log2(n))'''
+    if start >= end:
+        return None
+    middle = (start + end) // 2
+    node = Node(items[middle])
+    node.left_n = _build_balanced(items, start, middle)
+    node.right_n = _build_balanced(items, middle + 1, end)
+    _update_height(node)
+    return node
+
+if __name__ == "__main__":
+    import random
+
+    numtree = BinaryTree()
+    numtree.insert_item(9)
+    numtree.insert_item(3)
+    numtree.insert_item(7)
+    numtree.insert_item(1000)
+    numtree.insert_item(10)
+    print(numtree.get_smallest())       # prints 3
+    numtree.insert_item(2)
+    print(numtree.get_smallest())       # prints 2
+
+    ## sorted input stays balanced (an unbalanced tree would be 100000 deep)
+    sorted_tree = BinaryTree()
+    for position in range(0, 100000):
+        sorted_tree.insert_item(position)
+    assert sorted_tree.get_height() <= 18, "Failed Test"
+    assert sorted_tree.get_smallest() == 0 and sorted_tree.get_largest() == 99999, "Failed Test"
+    assert list(sorted_tree.range(500, 505)) == [500, 501, 502, 503, 504], "Failed Test"
 
+    ## random input with duplicates iterates in sorted order
+    random.seed(1)
+    items = [random.randrange(0, 1000) for i in range(0, 5000)]
+    random_tree = BinaryTree()
+    for item in items:
+        random_tree.insert_item(item)
+    assert list(random_tree) == sorted(items) and len(random_tree) == len(items), "Failed Test"
+    assert list(random_tree.range(100, 200)) == sorted(item for item in items if 100 <= item < 200), "Failed Test"
+    assert random_tree.get_height() <= 1.45 * 13, "Failed Test"
+    assert (items[0] in random_tree) and (1000 not in random_tree), "Failed Test"
 
-numtree = BinaryTree()
-numtree.insert_item(9)
-numtree.insert_item(3)
-numtree.insert_item(7)
-numtree.insert_item(1000)
-numtree.insert_item(10)
-print(numtree.get_smallest())       # prints 3
-numtree.insert_item(2)
-print(numtree.get_smallest())       # prints 2
+    ## bulk build from sorted input
+    bulk_tree = BinaryTree.from_sorted(sorted(items))
+    assert list(bulk_tree) == sorted(items) and bulk_tree.get_height() == 13, "Failed Test"
+    bulk_tree.insert_item(-1)
+    assert bulk_tree.get_smallest() == -1 and list(bulk_tree.range(None, 0)) == [-1], "Failed Test"
+    assert BinaryTree.from_sorted([]).get_largest() == None, "Failed Test"
+    print("Passed binary tree tests!")
@@ -0,0 +1,36 @@
+#!/usr/bin/env python
+import sys
+import argparse
+import MyBlastModule
+
+parser = argparse.ArgumentParser(prog = "blast_best_hits.py",
+    description = "This script prints the top N hits of each query in a BLAST tabular " +
+                  "(-outfmt 6 or 7) file, in one pass, keeping at most N hits per query " +
+                  "in memory.")
+parser.add_argument("blast_file")
+parser.add_argument("--top", type = int, default = 1, metavar = "N",
+    help = "hits to print per query (default: 1)")
+parser.add_argument("--rank-by", default = "evalue", choices = list(MyBlastModule.RANK_HIGHER_IS_BETTER),
+    help = "column to rank hits by; lowest E-value or highest other value is best (default: evalue)")
+parser.add_argument("--by-subject", action = "store_true",
+    help = "group hits by subject instead of query, e.g. to check reciprocal best hits")
+parser.add_argument("--fields", default = None,
+    help = "comma-separated column names of -outfmt 6 input with custom columns " +
+           "(default: the standard 12; -outfmt 7 files name their own columns)")
+args = parser.parse_args()
+if args.top < 1:
+    parser.error("--top must be at least 1")
+fields = None
+if args.fields is not None:
+    fields = args.fields.split(",")
+
+## Check the grouping and ranking columns against the file's header before streaming
+file_fields = MyBlastModule.table_fields(args.blast_file, fields)
+group_column = "sseqid" if args.by_subject else "qseqid"
+for column in [group_column, args.rank_by]:
+    if column not in file_fields:
+        parser.error(f"no {column} column in {args.blast_file} (it has: {','.join(file_fields)})")
+
+for id, lines in MyBlastModule.best_hits(args.blast_file, args.top, args.rank_by, args.by_subject, fields):
+    for line in lines:
+        sys.stdout.write(line + "\n")
@@ -1,16 +1,93 @@
 #!/usr/bin/env python
+import sys
+import argparse
+import MyBlastModule
 
-counter = 0
-eval_sum = 0.0
+DEFAULT_COLUMNS = ["evalue", "bitscore", "pident"]
 
-with open("pz_blastx_yeast_top1.txt", "r") as blast_handle:
-    for line in blast_handle:
-        line_stripped = line.strip()
-        line_list = line_stripped.split("\t")
-        eval_str = line_list[10]
+parser = argparse.ArgumentParser(prog = "blast_mean.py",
+    description = "This script summarizes numeric columns of BLAST tabular (-outfmt 6 or 7) " +
+                  "files: count, mean, min, max and approximate quantiles, overall and " +
+                  "optionally per query. With no arguments, it prints the mean E-value " +
+                  "of pz_blastx_yeast_top1.txt.")
+parser.add_argument("blast_files", nargs = "*", default = ["pz_blastx_yeast_top1.txt"])
+parser.add_argument("--columns", default = None,
+    help = "comma-separated numeric columns to summarize, e.g. " +
+           ", ".join(MyBlastModule.NUMERIC_COLUMNS) + " (default: those of " +
+           ",".join(DEFAULT_COLUMNS) + " that every file has)")
+parser.add_argument("--fields", default = None,
+    help = "comma-separated column names of -outfmt 6 input with custom columns " +
+           "(default: the standard 12; -outfmt 7 files name their own columns)")
+parser.add_argument("--quantiles", default = "0.25,0.5,0.75",
+    help = "comma-separated quantiles to report (default: 0.25,0.5,0.75)")
+parser.add_argument("--accuracy", type = float, default = 0.01,
+    help = "relative accuracy of the quantiles (default: 0.01)")
+parser.add_argument("--per-query", action = "store_true",
+    help = "also print the mean, min, quantiles and max of each column for every query")
 
-        eval_sum = eval_sum + float(eval_str)
-        counter = counter + 1
+legacy_mode = len(sys.argv) == 1
+args = parser.parse_args()
+fields = None
+if args.fields is not None:
+    fields = args.fields.split(",")
 
-mean = eval_sum/counter
-print(f"Mean is: {mean}")
\ No newline at end of file
+## Check the requested columns against each file's header before streaming
+files_fields = [MyBlastModule.table_fields(filename, fields) for filename in args.blast_files]
+if args.columns is None:
+    columns = [column for column in DEFAULT_COLUMNS if all(column in file_fields for file_fields in files_fields)]
+    if len(columns) == 0:
+        parser.error("none of the default columns " + ",".join(DEFAULT_COLUMNS) + " is in every file; use --columns")
+else:
+    columns = args.columns.split(",")
+    for filename, file_fields in zip(args.blast_files, files_fields):
+        for column in columns:
+            if column not in file_fields:
+                parser.error(f"no {column} column in {filename} (it has: {','.join(file_fields)})")
+            if column in MyBlastModule.TEXT_COLUMNS:
+                parser.error(f"not a numeric BLAST column: {column}")
+quantiles = [float(q) for q in args.quantiles.split(",")]
+
+## Each file is summarized on its own, then the (mergeable) summaries are combined
+columns_to_stats = None
+queries_to_stats = dict()
+for filename in args.blast_files:
+    file_columns_to_stats, file_queries_to_stats = MyBlastModule.blast_stats(filename, columns, args.per_query, args.accuracy, fields)
+    if columns_to_stats is None:
+        columns_to_stats = file_columns_to_stats
+    else:
+        for column in columns:
+            columns_to_stats[column].merge(file_columns_to_stats[column])
+    for qseqid, query_stats in file_queries_to_stats.items():
+        if qseqid in queries_to_stats:
+            for column in columns:
+                queries_to_stats[qseqid][column].merge(query_stats[column])
+        else:
+            queries_to_stats[qseqid] = query_stats
+
+if legacy_mode:
+    mean = columns_to_stats["evalue"].mean()
+    print(f"Mean is: {mean}")
+    quit()
+
+quantile_columns = "".join(f"\tq{q}" for q in quantiles)
+print(f"column\tcount\tmean\tmin{quantile_columns}\tmax")
+for column in columns:
+    stats = columns_to_stats[column]
+    quantile_values = "".join(f"\t{stats.quantile(q):.6g}" for q in quantiles)
+    print(f"{column}\t{stats.count}\t{stats.mean():.6g}\t{stats.minimum:.6g}{quantile_values}\t{stats.maximum:.6g}")
+
+if args.per_query:
+    print("")
+    query_columns = ""
+    for column in columns:
+        query_quantiles = "".join(f"\t{column}_q{q}" for q in quantiles)
+        query_columns = query_columns + f"\t{column}_mean\t{column}_min{query_quantiles}\t{column}_max"
+    print(f"query\thits{query_columns}")
+    for qseqid, query_stats in queries_to_stats.items():
+        fields = [qseqid, str(query_stats[columns[0]].count)]
+        for column in columns:
+            stats = query_stats[column]
+            fields.extend([f"{stats.mean():.6g}", f"{stats.minimum:.6g}"])
+            fields.extend(f"{stats.quantile(q):.6g}" for q in quantiles)
+            fields.append(f"{stats.maximum:.6g}")
+        print("\t".join(fields))
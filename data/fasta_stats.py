@@ -1,93 +1,19 @@
 #!/usr/bin/env python
 
 import sys
-import re
-import io
-
-if len(sys.argv) != 2:
-	print("Usage: fasta_dna_stats <fasta_file>")
-	print("This script is for informational purposes only, and requires that the input file be a DNA (As, Ts, Cs, and Gs) FASTA-formatted file.")
-	quit()
-
-
-####### Parse input
-def fasta_hash_from_file(filename):
-	handle = io.open(filename, "r")
-	seqs_dict = dict()
-	current_id = ""
-	current_seq_list = list()
-	
-	for line in handle:
-		line_list = re.split(r"\s+", line.strip())
-		if re.match(r"^>", line_list[0]):
-			if current_id != "":
-				seqs_dict[current_id] = "".join(current_seq_list)
-			current_id = re.subn(r"^>", "", line_list[0])[0]
-			current_seq_list = list()
-		else:
-			current_seq_list.append(line_list[0])
-
-	seqs_dict[current_id] = "".join(current_seq_list)
-	
-	return seqs_dict
-
-
-def longest_perfect_repeat(seq):
-	result = re.finditer(r"(.{1,10}?)\1{1,}", seq)
-	max = 1
-	maxrep = seq[0]
-	maxunit = seq[0]
-	for match in result:
-		unit = match.group(1)
-		if len(match.group(0)) > max and len(set(unit)) > 1:
-			max = len(match.group(0))
-			maxrep = match.group(0)
-			maxunit = match.group(1)
-
-	return [max, maxrep, maxunit]
+import argparse
+import itertools
+import collections
+import multiprocessing
+import MyFastaModule
+import MySeqModule
 
 
 def gc_content(seq):
-	gccount = 0
-	## strings are iterable too ;)
-	for base in seq:
-		if base == "G" or base == "C" or base == "g" or base == "c":
-			gccount = gccount + 1
-	rounded = int(float(gccount)/len(seq)*1000)/1000.0
+	rounded = int(MySeqModule.gc_content(seq)*1000)/1000.0
 	return(rounded)
 
 
-def most_common_fivemer(seq):
-	mers = dict()
-	for index in range(0, len(seq) - 5 + 1):
-		fivemer = seq[index:index+5]
-		if fivemer in mers:
-			mers[fivemer] = mers[fivemer] + 1
-		else:
-			mers[fivemer] = 1
-
-	max = 0
-	maxmer = ""
-	for fivemer in mers:
-		if mers[fivemer] > max:
-			max = mers[fivemer]
-			maxmer = fivemer
-
-	return [maxmer, max] 
-
-
-filename = sys.argv[1]
-seqs_dict = fasta_hash_from_file(filename)
-
-print("# Column 1: Sequence ID")
-print("# Column 2: GC content")
-print("# Column 3: Length")
-print("# Column 4: Most common 5mer")
-print("# Column 5: Count of most common 5mer")
-print("# Column 6: Repeat unit of longest simple perfect repeat (2 to 10 chars)")
-print("# Column 7: Length of repeat (in characters)")
-print("# Column 8: Repeat type (dinucleotide, trinucleotide, etc.)")
-
 types = dict()
 types[1] = "uninucleotide"
 types[2] = "dinucleotide"
@@ -100,21 +26,87 @@ types[8] = "octanucleotide"
 types[9] = "enneanucleotide"
 types[10] = "decanucleotide"
 
-for id in seqs_dict:
-	sys.stderr.write("Processing sequence ID " + id + "\n")
-
-	seq = seqs_dict[id]
-	sys.stdout.write(id + "\t")
-	sys.stdout.write(str(gc_content(seq)) + "\t")
-	sys.stdout.write(str(len(seq)) + "\t")
-
-	maxmer = most_common_fivemer(seq)
-	sys.stdout.write(maxmer[0] + "\t")
-	sys.stdout.write(str(maxmer[1]) + "\t")
-	
-	longest_rep_list = longest_perfect_repeat(seq)
-	sys.stdout.write("unit:" + longest_rep_list[2] + "\t")
-	sys.stdout.write(str(longest_rep_list[0]) + "\t")
-	sys.stdout.write(types[len(longest_rep_list[2])])
-
-	sys.stdout.write("\n")
\ No newline at end of file
+## Set by init_kmer_counter(), in the main process and in each worker process
+kmer_counter = None
+
+def init_kmer_counter(k, canonical):
+	global kmer_counter
+	kmer_counter = MySeqModule.KmerCounter(k, canonical)
+
+
+def seq_stats_line(id, seq):
+	'''Returns the 8-column output line (with newline) for one sequence'''
+	maxmer = kmer_counter.most_common(seq)
+	longest_rep_list = MySeqModule.longest_perfect_repeat(seq)
+
+	fields = [id, str(gc_content(seq)), str(len(seq))]
+	fields.append(maxmer[0])
+	fields.append(str(maxmer[1]))
+	fields.append("unit:" + longest_rep_list[2])
+	fields.append(str(longest_rep_list[0]))
+	fields.append(types[len(longest_rep_list[2])])
+	return "\t".join(fields) + "\n"
+
+
+def chunk_stats_lines(chunk):
+	'''Worker task: returns a list of (id, line) pairs for a list of (id, seq) records'''
+	return [(id, seq_stats_line(id, seq)) for id, seq in chunk]
+
+
+def parallel_stats_lines(records, jobs, chunk_size, k, canonical):
+	'''Generator yielding (id, line) pairs in input order, computed by a pool
+	of jobs worker processes. Records are sent in chunks of chunk_size, and at
+	most 2 * jobs chunks are in flight, so memory stays bounded.'''
+	pending = collections.deque()
+	with multiprocessing.Pool(jobs, init_kmer_counter, (k, canonical)) as pool:
+		while True:
+			chunk = list(itertools.islice(records, chunk_size))
+			if len(chunk) == 0:
+				break
+			pending.append(pool.apply_async(chunk_stats_lines, (chunk,)))
+			if len(pending) >= 2 * jobs:
+				yield from pending.popleft().get()
+		while len(pending) > 0:
+			yield from pending.popleft().get()
+
+
+parser = argparse.ArgumentParser(prog = "fasta_dna_stats",
+	description = "This script is for informational purposes only, and requires that the input file be a DNA (As, Ts, Cs, and Gs) FASTA-formatted file.")
+parser.add_argument("fasta_file")
+parser.add_argument("--k", type = int, default = 5, choices = range(1, MySeqModule.MAX_K + 1), metavar = "K",
+	help = "k-mer size for the most common k-mer columns (default: 5)")
+parser.add_argument("--canonical", action = "store_true",
+	help = "merge each k-mer with its reverse complement when counting")
+parser.add_argument("--jobs", type = int, default = 1, metavar = "N",
+	help = "number of worker processes (default: 1, no pool)")
+parser.add_argument("--chunk-size", type = int, default = 64, metavar = "C",
+	help = "records sent to a worker at a time with --jobs (default: 64)")
+
+if __name__ == "__main__":
+	args = parser.parse_args()
+	if args.jobs < 1 or args.chunk_size < 1:
+		parser.error("--jobs and --chunk-size must be at least 1")
+
+	filename = args.fasta_file
+	init_kmer_counter(args.k, args.canonical)
+
+	print("# Column 1: Sequence ID")
+	print("# Column 2: GC content")
+	print("# Column 3: Length")
+	print(f"# Column 4: Most common {args.k}mer")
+	print(f"# Column 5: Count of most common {args.k}mer")
+	print("# Column 6: Repeat unit of longest simple perfect repeat (2 to 10 chars)")
+	print("# Column 7: Length of repeat (in characters)")
+	print("# Column 8: Repeat type (dinucleotide, trinucleotide, etc.)")
+
+	## Records are streamed one at a time, so output starts with the first record
+	records = MyFastaModule.fasta_records(filename)
+	if args.jobs == 1:
+		for id, seq in records:
+			sys.stderr.write("Processing sequence ID " + id + "\n")
+			sys.stdout.write(seq_stats_line(id, seq))
+	else:
+		## Results come back in input order; progress is reported as each is written
+		for id, line in parallel_stats_lines(records, args.jobs, args.chunk_size, args.k, args.canonical):
+			sys.stderr.write("Processing sequence ID " + id + "\n")
+			sys.stdout.write(line)
@@ -1,4 +1,5 @@
 #!/usr/bin/env Python
+import MySeqModule
 
 class Gene:
     def __init__(self, creationid, creationseq):
@@ -18,18 +19,12 @@ class Gene:
     def print_len(self):
         print(f"My sequence len is: {len(self.sequence)}")
 
-    def base_composition(self, base): 
-        base_count = 0 
-        for index in range(0, len(self.sequence)): 
-            base_i = self.sequence[index] 
-            if base_i == base: 
-                base_count = base_count + 1 
-        return base_count 
+    def base_composition(self, base):
+        base = base.upper()
+        return MySeqModule.base_counts(self.sequence, base)[base]
 
     def gc_content(self):
-        g_count = self.base_composition("G")
-        c_count = self.base_composition("C")
-        return (g_count + c_count)/len(self.sequence)
+        return MySeqModule.gc_content(self.sequence)
 
     def get_seq(self): 
         return self.sequence 
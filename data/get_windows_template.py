@@ -1,13 +1,16 @@
 #!/usr/bin/env python
 
+import MySeqModule
+
 def get_windows(seq: str, windowsize: int, stepsize: int) -> list:
     """Given a string, windowsize (int) and step size (int),
     returns a list of windows of the windowsize.
     E.g. "TACTGG", 3, 2 => ["TAC", "CTG"]
+    Compatibility wrapper around MySeqModule.window_offsets(); for long
+    sequences iterate MySeqModule.SlidingWindows instead, which yields
+    views into the sequence with rolling GC and k-mer counts.
     """
-    pass        #pass is a keyword in Python we can use as a placeholder
-                #before we finish writing our code, replace it with your
-                #own code to complete the function
+    return [seq[start:end] for start, end in MySeqModule.window_offsets(len(seq), windowsize, stepsize)]
 
 seq = "ACGGTAGACCT"
 print(get_windows(seq, 3, 1))
@@ -1,22 +1,37 @@
 #!/usr/bin/env python
 import sys
+import argparse
+import MyTableModule
 
-if(sys.stdin.isatty()):
-    print("Usage: cat <annotation file> | ./go_id_count.py")
-    quit()
+parser = argparse.ArgumentParser(prog = "go_id_count.py",
+    usage = "cat <annotation file> | ./go_id_count.py [options]",
+    description = "This script counts how often each ID in the first column (or the " +
+                  "chosen columns) of standard input occurs, printing count and ID")
+parser.add_argument("--cols", type = MyTableModule.column_list, default = [0], metavar = "COLS",
+    help = "column(s) to count, e.g. 2 for the GO terms of PZ.annot.txt, or 1,2 for " +
+           "ID/term pairs (default: 1)")
+parser.add_argument("--top", type = int, default = None, metavar = "K",
+    help = "only print the K most frequent IDs, most frequent first")
+parser.add_argument("--max-ids", type = int, default = MyTableModule.MAX_IN_MEMORY_KEYS, metavar = "N",
+    help = "distinct IDs held in memory before partial counts are spilled to sorted " +
+           "files on disk; spilled output is in ID order " +
+           f"(default: {MyTableModule.MAX_IN_MEMORY_KEYS})")
+parser.add_argument("--tmp-dir", default = None,
+    help = "directory for spilled counts (default: the system one)")
 
-ids_to_counts = dict()
+if sys.stdin.isatty():
+    parser.print_help()
+    quit()
+args = parser.parse_args()
+if args.top is not None and args.top < 1:
+    parser.error("--top must be at least 1")
 
-# Parse input
-for line in sys.stdin:
-    line_list = line.strip().split("\t")
-    seqid = line_list[0]
-    if seqid in ids_to_counts:      #seqid already seen, update
-        ids_to_counts[seqid] += 1
-    else:                           #new seqid, initialize
-        ids_to_counts[seqid] = 1
+# Parse input; IDs come out in first-seen order unless counts were spilled
+ids_to_counts = MyTableModule.count_keys(sys.stdin.buffer, args.cols, args.max_ids, args.tmp_dir)
+if args.top is not None:
+    ids_to_counts = MyTableModule.top_counts(ids_to_counts, args.top)
 
-# Print dict contents
-for seqid in ids_to_counts:
-    count = ids_to_counts[seqid]
-    print(count, seqid, sep="\t")
\ No newline at end of file
+# Print counts and IDs
+with open(sys.stdout.fileno(), "wb", buffering = MyTableModule.TABLE_BUFFER_SIZE, closefd = False) as out:
+    for seqid, count in ids_to_counts:
+        out.write(b"%d\t%s\n" % (count, seqid))
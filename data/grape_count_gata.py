@@ -1,17 +1,53 @@
 #!/usr/bin/env python
 import re
+import argparse
+import MySeqModule
 
-def count_motifs(seq, motif):
-    pieces = re.split(motif, seq)
-    return len(pieces) - 1
+def read_motifs(filename):
+    '''Reads a motif library: one motif per line, as "name<tab>motif" or just
+    "motif" (which is then also its name); blank and # lines are skipped.'''
+    names_to_motifs = dict()
+    with open(filename, "r") as fhandle:
+        for line in fhandle:
+            line_list = line.strip().split("\t")
+            if line_list[0] == "" or line_list[0][0] == "#":
+                continue
+            names_to_motifs[line_list[0]] = line_list[-1]
+    return names_to_motifs
 
-with open("grape_promoters.txt", "r") as fhandle:
+parser = argparse.ArgumentParser(prog = "grape_count_gata.py",
+    description = "This script counts IUPAC motifs (by default the GATA box [AT]GATA[GA]) " +
+                  "in each promoter of a whitespace-separated <gene id> <sequence> file, " +
+                  "on both strands and including overlapping hits, and prints a gene by " +
+                  "motif count matrix.")
+parser.add_argument("promoters_file", nargs = "?", default = "grape_promoters.txt")
+parser.add_argument("--motif", action = "append", default = None, metavar = "MOTIF",
+    help = "a motif of IUPAC codes or [..] base classes; may be given several times")
+parser.add_argument("--motifs-file", default = None,
+    help = "file of motifs, one per line, as name<tab>motif or just motif")
+parser.add_argument("--forward-only", action = "store_true",
+    help = "do not count hits on the reverse strand")
+args = parser.parse_args()
+
+names_to_motifs = dict()
+if args.motif is not None:
+    for motif in args.motif:
+        names_to_motifs[motif] = motif
+if args.motifs_file is not None:
+    names_to_motifs.update(read_motifs(args.motifs_file))
+if len(names_to_motifs) == 0:
+    names_to_motifs["[AT]GATA[GA]"] = "[AT]GATA[GA]"
+
+## One automaton for all motifs, so each sequence is scanned once
+scanner = MySeqModule.MotifScanner(list(names_to_motifs.values()), both_strands = not args.forward_only)
+
+print("gene\t" + "\t".join(names_to_motifs))
+with open(args.promoters_file, "r") as fhandle:
     for line in fhandle:
         linestripped = line.strip()
         line_list = re.split(r"\s+", linestripped)
         gid = line_list[0]
         seq = line_list[1]
 
-
-        num_motifs = count_motifs(seq, r"[AT]GATA[GA]")
-        print(f"{gid}\t{num_motifs}")
\ No newline at end of file
+        counts = scanner.count(seq)
+        print(gid + "\t" + "\t".join(str(count) for count in counts))
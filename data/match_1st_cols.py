@@ -1,27 +1,38 @@
 #!/usr/bin/env python
 import sys
+import argparse
+import MyTableModule
 
-if sys.stdin.isatty() or len(sys.argv) != 2:
-    print("Usage: cat <id_list> | ./match_1st_cols.py <search_file>")
-    print("This script extracts lines from <search_file> where any entry")
-    print("    in the the first column of <id_list> matches the first column")
-    print("    of <search_file>")
-    quit()
+parser = argparse.ArgumentParser(prog = "match_1st_cols.py",
+    usage = "cat <id_list> | ./match_1st_cols.py [options] <search_file>",
+    description = "This script extracts lines from <search_file> where any entry " +
+                  "in the the first column of <id_list> matches the first column " +
+                  "of <search_file>")
+parser.add_argument("search_file")
+parser.add_argument("--id-cols", type = MyTableModule.column_list, default = [0], metavar = "COLS",
+    help = "column(s) of <id_list> to match, e.g. 2 or 1,3 for a composite key (default: 1)")
+parser.add_argument("--search-cols", type = MyTableModule.column_list, default = [0], metavar = "COLS",
+    help = "column(s) of <search_file> to match, in the same order as --id-cols (default: 1)")
+parser.add_argument("--jobs", type = int, default = 1, metavar = "N",
+    help = "number of processes filtering byte ranges of <search_file> (default: 1)")
+parser.add_argument("--max-ids", type = int, default = MyTableModule.MAX_IN_MEMORY_KEYS, metavar = "N",
+    help = "IDs held in memory before switching to a partitioned on-disk join " +
+           f"(default: {MyTableModule.MAX_IN_MEMORY_KEYS})")
+parser.add_argument("--tmp-dir", default = None,
+    help = "directory for the partitioned join's temporary files (default: the system one)")
 
-## Build IDs wanted dictionary from standard input
-ids_wanted = dict()
-for line in sys.stdin:
-    line_stripped = line.strip()
-    line_list = line_stripped.split("\t")
-    id = line_list[0]
-    ids_wanted[id] = "wanted"
+if sys.stdin.isatty():
+    parser.print_help()
+    quit()
+args = parser.parse_args()
+if len(args.id_cols) != len(args.search_cols):
+    parser.error("--id-cols and --search-cols must list the same number of columns")
+if args.jobs < 1:
+    parser.error("--jobs must be at least 1")
 
-## Loop over the file, print the lines that are wanted
-with open(sys.argv[1], "r") as fhandle:
-    for line in fhandle:
-        line_stripped = line.strip()
-        line_list = line_stripped.split("\t")
-        id = line_list[0]
-        # Is the ID one of the ones we want? 
-        if id in ids_wanted:
-            print(line_stripped)
\ No newline at end of file
+## IDs come from standard input, matching lines go to standard output; both
+## are handled as bytes, and output is written through a 1 MB buffer
+with open(sys.stdout.fileno(), "wb", buffering = MyTableModule.TABLE_BUFFER_SIZE, closefd = False) as out:
+    MyTableModule.join_by_key(sys.stdin.buffer, args.search_file, out,
+                              key_columns = args.id_cols, search_columns = args.search_cols,
+                              max_keys = args.max_ids, tmp_dir = args.tmp_dir, jobs = args.jobs)
@@ -1,36 +1,32 @@
 #!/usr/bin/env python
 ## Imports we are likely to need:
 import sys
-import re
+
+## Ref + alt pairs that are transitions (A<->G, C<->T)
+TRANSITION_PAIRS = frozenset(["AG", "GA", "CT", "TC"])
 
 ## A class representing simple SNPs
 class SNP:
+    __slots__ = ("chrname", "pos", "snpid", "refallele", "altallele", "transition")
+
     def __init__(self, chrname, pos, snpid, refallele, altallele):
         assert refallele != altallele, f"Error: ref == alt at pos {pos}"
-        self.chrname = chrname
+        self.chrname = sys.intern(chrname)
         self.pos = pos
         self.snpid = snpid
-        self.refallele = refallele
-        self.altallele = altallele
+        self.refallele = sys.intern(refallele)
+        self.altallele = sys.intern(altallele)
+        ## classify once, here, instead of on every count
+        self.transition = refallele + altallele in TRANSITION_PAIRS
 
     def is_transition(self):
         '''Returns True if refallele/altallele is A/G, G/A, C/T, or T/C'''
-        if self.refallele == "G" or self.refallele == "A":
-            if self.altallele == "G" or self.altallele == "A":
-                return True
-
-        if self.refallele == "C" or self.refallele == "T":
-            if self.altallele == "C" or self.altallele == "T":
-                return True
-
-        return False
+        return self.transition
 
     def is_transversion(self):
         '''Returns True if the snp is a transversion (i.e., not a transition)
         False otherwise'''
-        if self.is_transition():
-            return False
-        return True
+        return not self.transition
     
 ## transition test; should not result in "Failed Test"
 snp1 = SNP("1", 12351, "rs11345", "C", "T")
@@ -53,8 +49,9 @@ except Exception as e:
 ## A class representing a chromosome, which has a collection of SNPs
 class Chromosome:
     def __init__(self, chrname):
-        self.chrname = chrname
+        self.chrname = sys.intern(chrname)
         self.locations_to_snps = dict()
+        self.transitions = 0        # running count, updated by add_snp()
 
     ## Returns the chromosome name
     def get_name(self):
@@ -74,20 +71,17 @@ class Chromosome:
         ## Otherwise, create the SNP object and add it to the dictionary
         newsnp = SNP(chrname, pos, snpid, refallele, altallele)
         self.locations_to_snps[pos] = newsnp
+        if newsnp.transition:
+            self.transitions += 1
 
     def count_transitions(self):
         '''Returns the number of transition SNPs stored in the chromosome'''
-        count = 0
-        for location in self.locations_to_snps:
-            snp = self.locations_to_snps[location]
-            if snp.is_transition():
-                count += 1
-        return count
+        return self.transitions
 
     def count_transversions(self):
         '''Returns the number of transversion SNPs stored in this chromosome'''
         total_snps = len(self.locations_to_snps)
-        return total_snps - self.count_transitions()
+        return total_snps - self.transitions
 
 ## A test chromosome
 chr1 = Chromosome("testChr")
@@ -123,14 +117,14 @@ with open(filename, "r") as fhandle:
     for line in fhandle:
         # don't attempt to parse header lines
         if line[0] != "#":
-            line_stripped = line.strip()
-            line_list = re.split(r"\s+", line_stripped)
+            ## only split off the first five fields; genotype columns can be many
+            line_list = line.split("\t", 5)
 
             chrname = line_list[0]
             pos = int(line_list[1])
             snpid = line_list[2]
             refallele = line_list[3]
-            altallele = line_list[4]
+            altallele = line_list[4].rstrip()
 
             ## Put the data in the dictionary
             if chrname in chrnames_to_chrs:
@@ -1,18 +1,28 @@
 #!/usr/bin/env python
 import MyVCFModule
-import sys
+import argparse
 
-## Check usage syntax, read filename 
-if len(sys.argv) != 2:
-    print("This program parses a VCF 4.0 file and counts")
-    print("transitions and transversions on a per-chromosome basis.")
-    print("")
-    print("Usage: ./snps_ex2.py <input_vcf_file>")
-    quit()
+## Check usage syntax, read filename
+parser = argparse.ArgumentParser(prog = "snps_ex2.py",
+    description = "This program parses a VCF 4.0 file and counts transitions and transversions " +
+                  "on a per-chromosome basis.")
+parser.add_argument("input_vcf_file")
+parser.add_argument("--workers", type = int, default = 1,
+    help = "number of processes used to parse an uncompressed VCF (default: 1)")
+parser.add_argument("--cache", action = "store_true",
+    help = "reuse (or create) a parsed-data cache next to the VCF file")
+parser.add_argument("--stream", action = "store_true",
+    help = "only keep running counts per chromosome instead of the SNPs (constant memory)")
+args = parser.parse_args()
+if args.stream and (args.cache or args.workers > 1):
+    parser.error("--stream cannot be combined with --cache or --workers")
 
-filename = sys.argv[1]
+filename = args.input_vcf_file
 
-chrnames_to_chrs = MyVCFModule.vcf_to_chrnames_dict(filename)
+if args.stream:
+    chrnames_to_chrs = MyVCFModule.vcf_to_transition_counts(filename)
+else:
+    chrnames_to_chrs = MyVCFModule.vcf_to_chrnames_dict(filename, workers = args.workers, cache = args.cache)
 
 ## Print the results!
 print(f"chrom\ttransitions\ttransversions")
@@ -20,4 +30,4 @@ for chrname in chrnames_to_chrs:
     chr_obj = chrnames_to_chrs[chrname]
     trs = chr_obj.count_transitions()
     trv = chr_obj.count_transversions()
-    print(f"{chrname}\t{trs}\t{trv}")
\ No newline at end of file
+    print(f"{chrname}\t{trs}\t{trv}")
@@ -1,14 +1,59 @@
 #!/usr/bin/env python
+import argparse
+import MyFastaModule
+import MyCodonModule
 
-with open("seq.txt", "r") as fhandle:
-    seq = fhandle.readline()
-    seq = seq.strip()
+def is_fasta(filename):
+    '''Returns True if the file starts with a FASTA header'''
+    with open(filename, "r") as fhandle:
+        return fhandle.read(1) == ">"
 
-    stop_counter = 0
-    for index in range(0, len(seq) - 3 + 1):
-        codon = seq[index:index + 3]
-        #print(codon)
-        if codon == "TAG" or codon == "TAA" or codon == "TGA":
-            stop_counter = stop_counter + 1
+def seq_records(filename):
+    '''Yields (id, seq) for each record of a FASTA file, or a single
+    (filename, seq) record for a plain sequence file like seq.txt'''
+    if is_fasta(filename):
+        yield from MyFastaModule.fasta_records(filename)
+    else:
+        with open(filename, "r") as fhandle:
+            yield (filename, "".join(line.strip() for line in fhandle))
 
-print(stop_counter)
\ No newline at end of file
+parser = argparse.ArgumentParser(prog = "stop_count_seq.py",
+    description = "This script counts stop codons (TAG, TAA, TGA) at every position of a " +
+                  "sequence file (plain, like seq.txt, or multi-record FASTA), optionally " +
+                  "per reading frame and strand, and can list open reading frames.")
+parser.add_argument("seq_file", nargs = "?", default = "seq.txt")
+parser.add_argument("--frames", action = "store_true",
+    help = "print stop and start (ATG) codon counts for each reading frame")
+parser.add_argument("--reverse", action = "store_true",
+    help = "with --frames, also count on the reverse complement")
+parser.add_argument("--orfs", type = int, default = None, metavar = "MIN_LENGTH",
+    help = "instead of counting, list ORFs (ATG to stop) of at least MIN_LENGTH bases on both strands")
+args = parser.parse_args()
+if args.reverse and not args.frames:
+    parser.error("--reverse requires --frames")
+
+records = seq_records(args.seq_file)
+if args.orfs is not None:
+    print("id\tstrand\tframe\tstart\tend\tlength")
+    for id, seq in records:
+        for strand, frame, start, end in MyCodonModule.find_orfs(seq, args.orfs):
+            print(f"{id}\t{strand}\t{frame}\t{start + 1}\t{end}\t{end - start}")
+
+elif args.frames:
+    print("id\tstrand\tstops_frame0\tstops_frame1\tstops_frame2\tstarts_frame0\tstarts_frame1\tstarts_frame2")
+    for id, seq in records:
+        strands = ["+", "-"] if args.reverse else ["+"]
+        for strand in strands:
+            counts = MyCodonModule.codon_frame_counts(seq, reverse = strand == "-")
+            fields = [id, strand] + [str(count) for count in counts["stops"] + counts["starts"]]
+            print("\t".join(fields))
+
+else:
+    ## stops in all three frames, as the original position-by-position loop counted them
+    fasta_input = is_fasta(args.seq_file)
+    for id, seq in records:
+        stop_counter = sum(MyCodonModule.frame_counts(MyCodonModule.codon_codes(seq)))
+        if fasta_input:
+            print(f"{id}\t{stop_counter}")
+        else:
+            print(stop_counter)
@@ -1,16 +1,13 @@
 #!/usr/bin/env python
+import MyCodonModule
 
+## Read the whole sequence (it may be wrapped over several lines)
 with open("seq.txt", "r") as fhandle:
-    seq = fhandle.readline()
-    seq = seq.strip()
+    seq = "".join(line.strip() for line in fhandle)
 
-    stop_counter = 0
-    index = 0
-    while index <= len(seq) - 3:
-        codon = seq[index:index + 3]
-        #print(codon)
-        if codon == "TAG" or codon == "TAA" or codon == "TGA":
-            stop_counter = stop_counter + 1
-        index += 1       # equivalent to index = index + 1
+## Rather than slicing out the codon at each index in a while loop, the
+## sequence is encoded once and the stops of all three frames are counted
+## by MyCodonModule in C
+stop_counter = sum(MyCodonModule.codon_frame_counts(seq)["stops"])
 
-print(stop_counter)
\ No newline at end of file
+print(stop_counter)